@@ -0,0 +1,470 @@
+"""
+Benchmark suite for the filemanager connector hot paths.
+
+Generates synthetic trees of files (with a configurable share of images) and measures folder listings,
+file info, thumbnails, uploads and downloads through the Flask test client.  Results are written to a JSON
+file which can be compared against the results from another commit:
+
+    python benchmarks/bench_filemanager.py run --sizes 1000,10000 --output before.json
+    ... make changes ...
+    python benchmarks/bench_filemanager.py run --sizes 1000,10000 --output after.json
+    python benchmarks/bench_filemanager.py compare before.json after.json
+
+Generated trees are cached in --data-dir, so repeated runs (and runs with 100000 files) don't have to
+regenerate them every time.
+
+To simulate a high latency filesystem such as NFS, --stat-latency-ms adds a delay to every stat and access
+call made while timing.  Combine it with --parallel-stat-workers to compare sequential and parallel listings:
+
+    python benchmarks/bench_filemanager.py run --stat-latency-ms 2 --parallel-stat-workers 16
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(BENCHMARK_DIR, '..')))
+
+from flask import Flask
+import PIL.Image
+
+import flaskfilemanager
+from flaskfilemanager import FileManager
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+CONNECTOR_URL = '/fm/connectors/py/filemanager.py'
+PARALLEL_CONNECTOR_URL = '/fm-parallel/connectors/py/filemanager.py'
+MB = 1024 * 1024
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARK_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def create_image_data(width=1600, height=1200):
+    """
+    :return: The bytes of a JPEG with some noise in it, so that it doesn't compress down to nothing
+    """
+    image = PIL.Image.effect_noise((width, height), 64).convert('RGB')
+    image_io = io.BytesIO()
+    image.save(image_io, format='JPEG', quality=85)
+    return image_io.getvalue()
+
+
+def generate_tree(root, num_files, image_share, seed=1):
+    """
+    Generate a folder containing num_files files, some of which are images.  A few sub folders are
+    also created, as the listing code treats folders and files differently.
+
+    The tree is only generated if it doesn't exist already.
+    """
+    marker_path = root + '.complete'
+    if os.path.exists(marker_path):
+        return
+
+    log.info('Generating tree of {} files in {}'.format(num_files, root))
+
+    if os.path.exists(root):
+        shutil.rmtree(root)
+
+    os.makedirs(root)
+
+    rand = random.Random(seed)
+    image_data = create_image_data()
+    text_data = b'Lorem ipsum dolor sit amet\n' * 40
+
+    num_folders = max(1, num_files // 100)
+    for i in range(num_folders):
+        os.mkdir(os.path.join(root, 'Folder {:06d}'.format(i)))
+
+    for i in range(num_files - num_folders):
+        if rand.random() < image_share:
+            filename = 'Image {:06d}.jpg'.format(i)
+            data = image_data
+        else:
+            filename = 'document {:06d}.txt'.format(i)
+            data = text_data
+
+        with open(os.path.join(root, filename), 'wb') as f:
+            f.write(data)
+
+    with open(marker_path, 'w') as f:
+        f.write(datetime.datetime.now().isoformat())
+
+
+def create_app(data_dir, parallel_stat_workers=None):
+    app = Flask(__name__)
+    app.config['FLASKFILEMANAGER_FILE_PATH'] = data_dir
+    flaskfilemanager.init(app)
+
+    if parallel_stat_workers:
+        FileManager(app, name='flaskfilemanager_parallel', url_prefix='/fm-parallel',
+                    config={'PARALLEL_STAT_WORKERS': parallel_stat_workers})
+
+    return app
+
+
+@contextlib.contextmanager
+def slow_stat(latency):
+    """
+    Simulate a high latency filesystem by sleeping in every os.stat and os.access call.  The os.path
+    functions all use os.stat, so are slowed down as well
+    """
+    if not latency:
+        yield
+        return
+
+    real_stat = os.stat
+    real_access = os.access
+
+    def stat(*args, **kwargs):
+        time.sleep(latency)
+        return real_stat(*args, **kwargs)
+
+    def access(*args, **kwargs):
+        time.sleep(latency)
+        return real_access(*args, **kwargs)
+
+    os.stat = stat
+    os.access = access
+    try:
+        yield
+    finally:
+        os.stat = real_stat
+        os.access = real_access
+
+
+def time_calls(fun, repeat):
+    """
+    :return: List of durations in seconds of repeat calls to fun
+    """
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fun()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def summarise(timings):
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'count': len(timings)
+    }
+
+
+def check_response(response):
+    if response.status_code != 200:
+        raise Exception('Request failed with status {}: {}'.format(response.status_code, response.data[:200]))
+
+    if response.mimetype == 'application/json':
+        data = json.loads(response.data.decode())
+        if 'errors' in data:
+            raise Exception('Connector returned error: {}'.format(data['errors']))
+        return data
+
+    return response.data
+
+
+def bench_get_folder(client, web_path, num_entries, repeat, url=CONNECTOR_URL):
+    def get_folder():
+        check_response(client.get(url, query_string={'mode': 'getfolder', 'path': web_path}))
+
+    stats = summarise(time_calls(get_folder, repeat))
+    stats['per_entry_us'] = stats['median'] / num_entries * 1e6
+    stats['primary'] = 'median'
+    stats['higher_is_better'] = False
+    return stats
+
+
+def bench_get_file(client, web_paths):
+    def get_files():
+        for web_path in web_paths:
+            check_response(client.get(CONNECTOR_URL, query_string={'mode': 'getfile', 'path': web_path}))
+
+    timings = time_calls(get_files, 3)
+    stats = summarise([t / len(web_paths) for t in timings])
+    stats['primary'] = 'median'
+    stats['higher_is_better'] = False
+    return stats
+
+
+def bench_thumbnails(client, web_paths):
+    def get_thumbnails():
+        for web_path in web_paths:
+            check_response(client.get(CONNECTOR_URL, query_string={
+                'mode': 'getimage', 'path': web_path, 'thumbnail': 'true'
+            }))
+
+    timings = time_calls(get_thumbnails, 3)
+    stats = summarise([t / len(web_paths) for t in timings])
+    stats['primary'] = 'median'
+    stats['higher_is_better'] = False
+    return stats
+
+
+def upload(client, web_path, filename, data):
+    return check_response(client.post(CONNECTOR_URL, content_type='multipart/form-data', data={
+        'mode': 'upload',
+        'path': web_path,
+        'files': (io.BytesIO(data), filename)
+    }))
+
+
+def bench_upload(client, data_dir, file_size, count):
+    web_path = '/bench-uploads/'
+    os_path = os.path.join(data_dir, 'bench-uploads')
+    data = os.urandom(file_size)
+
+    def reset():
+        if os.path.exists(os_path):
+            shutil.rmtree(os_path)
+        os.mkdir(os_path)
+
+    # Throughput
+    reset()
+    start = time.perf_counter()
+    for i in range(count):
+        upload(client, web_path, 'upload-{}.bin'.format(i), data)
+    elapsed = time.perf_counter() - start
+
+    # Peak memory of a single upload.  This is done separately as tracemalloc slows everything down
+    reset()
+    tracemalloc.start()
+    try:
+        upload(client, web_path, 'upload-memory.bin', data)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    shutil.rmtree(os_path)
+
+    return {
+        'mb_per_second': file_size * count / elapsed / MB,
+        'seconds': elapsed,
+        'count': count,
+        'file_size': file_size,
+        'peak_memory_bytes': peak,
+        'primary': 'mb_per_second',
+        'higher_is_better': True
+    }
+
+
+def bench_download(client, data_dir, file_size, count):
+    filename = 'bench-download.bin'
+    os_path = os.path.join(data_dir, filename)
+    with open(os_path, 'wb') as f:
+        f.write(os.urandom(file_size))
+
+    def download():
+        response = client.get(CONNECTOR_URL, query_string={'mode': 'download', 'path': '/' + filename})
+        data = check_response(response)
+        if len(data) != file_size:
+            raise Exception('Downloaded {} bytes, expected {}'.format(len(data), file_size))
+
+    try:
+        timings = time_calls(download, count)
+    finally:
+        os.remove(os_path)
+
+    elapsed = sum(timings)
+    return {
+        'mb_per_second': file_size * count / elapsed / MB,
+        'seconds': elapsed,
+        'count': count,
+        'file_size': file_size,
+        'primary': 'mb_per_second',
+        'higher_is_better': True
+    }
+
+
+def run(args):
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='flaskfilemanager-bench-')
+    data_dir = os.path.abspath(data_dir)
+    os.makedirs(data_dir, exist_ok=True)
+
+    app = create_app(data_dir, args.parallel_stat_workers)
+    client = app.test_client()
+    rand = random.Random(args.seed)
+
+    results = {}
+
+    for num_files in args.sizes:
+        tree_name = 'tree-{}-{}'.format(num_files, int(args.image_share * 100))
+        tree_path = os.path.join(data_dir, tree_name)
+        generate_tree(tree_path, num_files, args.image_share, seed=args.seed)
+        web_path = '/{}/'.format(tree_name)
+
+        filenames = sorted(os.listdir(tree_path))
+        images = [f for f in filenames if f.endswith('.jpg')]
+        files = [f for f in filenames if os.path.isfile(os.path.join(tree_path, f))]
+
+        log.info('Benchmarking tree of {} files'.format(num_files))
+
+        with slow_stat(args.stat_latency_ms / 1000.0):
+            key = 'getfolder[n={}]'.format(num_files)
+            results[key] = bench_get_folder(client, web_path, len(filenames), args.repeat)
+            log.info('{}: {:.3f}s'.format(key, results[key]['median']))
+
+            if args.parallel_stat_workers:
+                key = 'getfolder-parallel[n={}]'.format(num_files)
+                results[key] = bench_get_folder(client, web_path, len(filenames), args.repeat,
+                                                url=PARALLEL_CONNECTOR_URL)
+                log.info('{}: {:.3f}s'.format(key, results[key]['median']))
+
+            sample = rand.sample(files, min(args.sample, len(files)))
+            key = 'getfile[n={}]'.format(num_files)
+            results[key] = bench_get_file(client, [web_path + f for f in sample])
+            log.info('{}: {:.2f}ms'.format(key, results[key]['median'] * 1000))
+
+        if images:
+            sample = rand.sample(images, min(args.sample, len(images)))
+            key = 'thumbnail[n={}]'.format(num_files)
+            results[key] = bench_thumbnails(client, [web_path + f for f in sample])
+            log.info('{}: {:.2f}ms'.format(key, results[key]['median'] * 1000))
+
+    key = 'upload[size={}]'.format(args.transfer_size)
+    results[key] = bench_upload(client, data_dir, args.transfer_size, args.transfer_count)
+    log.info('{}: {:.1f}MB/s, peak memory {:.1f}MB'.format(key, results[key]['mb_per_second'],
+                                                           results[key]['peak_memory_bytes'] / MB))
+
+    key = 'download[size={}]'.format(args.transfer_size)
+    results[key] = bench_download(client, data_dir, args.transfer_size, args.transfer_count)
+    log.info('{}: {:.1f}MB/s'.format(key, results[key]['mb_per_second']))
+
+    output = {
+        'meta': {
+            'commit': get_git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'image_share': args.image_share,
+            'stat_latency_ms': args.stat_latency_ms,
+            'parallel_stat_workers': args.parallel_stat_workers,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2, sort_keys=True)
+
+    log.info('Results written to {}'.format(args.output))
+
+    if not args.data_dir:
+        shutil.rmtree(data_dir)
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print('Baseline: {} ({})'.format(baseline['meta']['commit'], baseline['meta']['timestamp']))
+    print('Current:  {} ({})'.format(current['meta']['commit'], current['meta']['timestamp']))
+    print()
+
+    regressions = []
+
+    for key in sorted(set(baseline['results']) | set(current['results'])):
+        if key not in baseline['results'] or key not in current['results']:
+            print('{:<32} only in {}'.format(key, 'baseline' if key in baseline['results'] else 'current'))
+            continue
+
+        old = baseline['results'][key]
+        new = current['results'][key]
+        metric = new['primary']
+        change = (new[metric] - old[metric]) / old[metric]
+
+        # Positive change is always "worse" from here on
+        worse = -change if new['higher_is_better'] else change
+        flag = ''
+        if worse > args.threshold:
+            flag = 'REGRESSION'
+            regressions.append(key)
+        elif worse < -args.threshold:
+            flag = 'improved'
+
+        print('{:<32} {:>8} {:>14.6g} -> {:<14.6g} {:+7.1%} {}'.format(key, metric, old[metric], new[metric],
+                                                                       change, flag))
+
+    if regressions:
+        print()
+        print('{} regression(s) above {:.0%} threshold'.format(len(regressions), args.threshold))
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--sizes', default='1000,10000',
+                            type=lambda s: [int(x) for x in s.split(',')],
+                            help='Comma separated number of files in each tree (default 1000,10000)')
+    run_parser.add_argument('--image-share', type=float, default=0.2,
+                            help='Fraction of generated files which are images (default 0.2)')
+    run_parser.add_argument('--data-dir', help='Directory to generate (and cache) trees in. Defaults to a '
+                                               'temporary directory which is deleted afterwards')
+    run_parser.add_argument('--repeat', type=int, default=5, help='Number of times to list each folder')
+    run_parser.add_argument('--sample', type=int, default=50,
+                            help='Number of files to fetch info / thumbnails for in each tree')
+    run_parser.add_argument('--transfer-size', type=int, default=16 * MB,
+                            help='Size in bytes of uploaded / downloaded files (default 16MB)')
+    run_parser.add_argument('--transfer-count', type=int, default=5,
+                            help='Number of uploads and downloads to time')
+    run_parser.add_argument('--stat-latency-ms', type=float, default=0,
+                            help='Delay added to every stat / access call while listing, to simulate NFS')
+    run_parser.add_argument('--parallel-stat-workers', type=int,
+                            help='Also benchmark folder listings with this many parallel stat threads')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--output', default='bench_output.json', help='JSON file to write results to')
+    run_parser.set_defaults(fun=run)
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two sets of results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='Relative change that counts as a regression (default 0.1)')
+    compare_parser.set_defaults(fun=compare)
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # The connector logs every response at debug level and every error at error level - keep it quiet
+    logging.getLogger('flaskfilemanager').setLevel(logging.CRITICAL)
+
+    args.fun(args)
+
+
+if __name__ == '__main__':
+    main()
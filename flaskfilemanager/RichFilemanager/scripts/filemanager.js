@@ -3874,7 +3874,14 @@ $.richFilemanagerPlugin = function(element, pluginOptions)
                 fm.success(lg('successful_edit'));
             }
             handleAjaxResponseErrors(response);
-        }).fail(handleAjaxError);
+        }).fail(function(response) {
+            // The file was changed by someone else since it was opened, and saving would overwrite their changes
+            if(response.status === 409) {
+                fm.error(lg('ERROR_FILE_CHANGED') || lg('ERROR_SAVING_FILE'));
+            } else {
+                handleAjaxError(response);
+            }
+        });
 	};
 
     var getItemInfo = function(targetPath) {
@@ -4274,7 +4281,7 @@ $.richFilemanagerPlugin = function(element, pluginOptions)
 						dataType: 'json',
 						dropZone: $dropzone,
 						maxChunkSize: config.upload.chunkSize,
-						url: buildConnectorUrl(),
+						url: buildConnectorUrl({mode: 'upload'}),
 						paramName: 'files',
 						singleFileUploads: true,
 						formData: extendRequestParams('POST', {
@@ -4456,7 +4463,7 @@ $.richFilemanagerPlugin = function(element, pluginOptions)
 				.fileupload({
 					autoUpload: true,
 					dataType: 'json',
-					url: buildConnectorUrl(),
+					url: buildConnectorUrl({mode: 'upload'}),
 					paramName: 'files',
 					maxChunkSize: config.upload.chunkSize
 				})
@@ -3,7 +3,6 @@ Rich File Manager for Flask
 """
 
 from .filemanager import filemanager_blueprint as blueprint
-from .filemanager import init, set_access_control_function
+from .filemanager import init, set_access_control_function, FileManager
 
 __author__ = 'Stephen Brown (Little Fish Solutions LTD)'
-
@@ -0,0 +1,158 @@
+"""
+Admission control for connector requests.
+
+Expensive modes (thumbnails, copies etc.) can be limited to a number of concurrent requests, so that a burst
+of them can't tie up every worker thread and starve cheap requests like getfolder.  Requests over the limit
+wait in a bounded queue for a short time, and are rejected straight away if the queue is full, so that
+clients can back off instead of piling up.
+
+Each client can also be rate limited with a token bucket, so that one user's bulk actions can't monopolise
+the workers.
+"""
+
+import logging
+import math
+import threading
+import time
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+# Maximum number of clients to track before idle ones are forgotten
+MAX_CLIENTS = 10000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, status_code, retry_after):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ModeLimit(object):
+    """
+    Limits the number of requests for one mode running at once
+    """
+
+    def __init__(self, mode, concurrency, queue_size):
+        self.mode = mode
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+
+        self._condition = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+
+    def acquire(self, timeout):
+        """
+        :return: True if a slot was acquired, False if the queue is full or we timed out waiting
+        """
+        with self._condition:
+            if self.running < self.concurrency and not self.waiting:
+                self.running += 1
+                return True
+
+            if self.waiting >= self.queue_size:
+                return False
+
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.running < self.concurrency, timeout):
+                    return False
+
+                self.running += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.running -= 1
+            self._condition.notify()
+
+
+class Slot(object):
+    """
+    Context manager that releases an admitted request's slot when it finishes
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.limit is not None:
+            self.limit.release()
+
+
+class AdmissionController(object):
+    def __init__(self, limits=None, queue_size=10, timeout=5, retry_after=1, rate=None, burst=None):
+        """
+        :param limits: Dictionary of mode to the maximum number of requests for that mode that can run at once.
+                       Modes that aren't in the dictionary aren't limited
+        :param queue_size: Maximum number of requests for each limited mode waiting for a slot
+        :param timeout: Maximum time (in seconds) that a request waits for a slot
+        :param retry_after: Value of the Retry-After header (in seconds) when a request is rejected because
+                            its mode is busy
+        :param rate: Maximum sustained requests per second for each client, or None for no rate limit
+        :param burst: Maximum number of requests a client can make at once before the rate limit applies.
+                      Defaults to twice the rate
+        """
+        self.limits = {mode: ModeLimit(mode, concurrency, queue_size) for mode, concurrency in (limits or {}).items()}
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, (rate or 0) * 2)
+
+        self._lock = threading.Lock()
+        # Client key -> (tokens, time they were counted)
+        self._buckets = {}
+
+    def check_rate(self, client):
+        """
+        Take a token from the client's bucket.  Raises AdmissionRejected if it is empty
+        """
+        if not self.rate:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+            if tokens < 1:
+                self._buckets[client] = (tokens, now)
+                retry_after = int(math.ceil((1 - tokens) / self.rate))
+                raise AdmissionRejected('Too many requests', 429, retry_after)
+
+            self._buckets[client] = (tokens - 1, now)
+
+            if len(self._buckets) > MAX_CLIENTS:
+                self._prune(now)
+
+    def _prune(self, now):
+        # A bucket that would have refilled by now is the same as no bucket at all
+        refill_time = self.burst / self.rate
+        self._buckets = {client: bucket for client, bucket in self._buckets.items()
+                         if now - bucket[1] < refill_time}
+
+    def admit(self, mode):
+        """
+        Wait for a slot to run a request for mode.  Raises AdmissionRejected if the mode is too busy
+
+        :return: A Slot, which must be used as a context manager around the request
+        """
+        limit = self.limits.get(mode)
+        if limit is None:
+            return Slot()
+
+        if not limit.acquire(self.timeout):
+            log.warning('Rejecting {} request: {} running, {} waiting'.format(mode, limit.running, limit.waiting))
+            raise AdmissionRejected('Server busy, please try again', 503, self.retry_after)
+
+        return Slot(limit)
@@ -0,0 +1,227 @@
+"""
+Feed of changes to directories, used to push updates to clients with server-sent events instead of them
+polling getfolder.
+
+Changes are published by the connector's own mutation functions.  If inotify_simple is installed, changes
+made by other processes (other workers, or anything else writing to the root) are picked up with inotify as
+well.  Changes are keyed by OS directory path, so subscribers only see changes in the directory they are
+watching.
+"""
+
+import logging
+import collections
+import os
+import queue
+import threading
+import time
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+# Sent to a subscriber whose queue overflowed, to tell it to reload the whole folder
+RESET = 'reset'
+# inotify events for a path are ignored for this long (in seconds) after the connector publishes a change to
+# it, as the connector's event has more information
+SUPPRESS_SECONDS = 2
+# inotify events usually arrive before the connector has published its own event for the same change, so they
+# are held back for this long (in seconds) to give it a chance to
+WATCHER_DELAY = 0.5
+# Temporary files written by the connector start with this, and changes to them are never published
+TMP_PREFIX = '.flaskfilemanager-tmp-'
+
+
+class ChangeFeed(object):
+    def __init__(self, queue_size=1000, use_inotify=True):
+        """
+        :param queue_size: Maximum number of undelivered events per subscriber.  If a subscriber falls further
+                           behind than this, its events are dropped and it is sent a reset
+        :param use_inotify: Set to False to disable the inotify watcher even if inotify_simple is installed
+        """
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        # OS directory path -> set of subscriber queues
+        self._subscribers = {}
+        # (OS directory path, name) -> time of last change published by the connector
+        self._recent = {}
+
+        self.watcher = None
+        if use_inotify:
+            if inotify_simple is None:
+                log.info('inotify_simple is not installed - only changes made by this process will be seen')
+            else:
+                self.watcher = InotifyWatcher(self)
+
+    def subscribe(self, os_dir_path):
+        os_dir_path = os.path.normpath(os_dir_path)
+        subscriber = queue.Queue(maxsize=self.queue_size)
+
+        with self._lock:
+            subscribers = self._subscribers.setdefault(os_dir_path, set())
+            subscribers.add(subscriber)
+            first = len(subscribers) == 1
+
+        if first and self.watcher:
+            self.watcher.watch(os_dir_path)
+
+        return subscriber
+
+    def unsubscribe(self, os_dir_path, subscriber):
+        os_dir_path = os.path.normpath(os_dir_path)
+
+        with self._lock:
+            subscribers = self._subscribers.get(os_dir_path, set())
+            subscribers.discard(subscriber)
+            last = not subscribers
+            if last:
+                self._subscribers.pop(os_dir_path, None)
+
+        if last and self.watcher:
+            self.watcher.unwatch(os_dir_path)
+
+    def publish(self, os_dir_path, change_type, name, item=None, old_name=None, from_watcher=False):
+        """
+        :param os_dir_path: The directory containing the changed file or folder
+        :param change_type: One of 'create', 'modify', 'rename' or 'delete'
+        :param name: Name of the changed file or folder in the directory
+        :param item: The get_file() style item for the file, or None to have the subscriber load it
+        :param old_name: The old name, for renames
+        """
+        os_dir_path = os.path.normpath(os_dir_path)
+        key = (os_dir_path, name)
+        now = time.time()
+
+        with self._lock:
+            if from_watcher:
+                if now - self._recent.get(key, 0) < SUPPRESS_SECONDS:
+                    return
+            else:
+                self._recent[key] = now
+                if old_name:
+                    self._recent[(os_dir_path, old_name)] = now
+
+                if len(self._recent) > 10000:
+                    self._recent = {k: t for k, t in self._recent.items() if now - t < SUPPRESS_SECONDS}
+
+            subscribers = list(self._subscribers.get(os_dir_path, ()))
+
+        event = {
+            'type': change_type,
+            'name': name,
+            'item': item,
+            'old_name': old_name
+        }
+
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # The client can't keep up, so throw away what it hasn't seen and tell it to reload
+                self._reset(subscriber)
+
+    def _reset(self, subscriber):
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+
+        try:
+            subscriber.put_nowait(RESET)
+        except queue.Full:
+            pass
+
+
+class InotifyWatcher(object):
+    """
+    Publishes changes made to watched directories by anything other than this process
+    """
+
+    def __init__(self, feed):
+        self.feed = feed
+        self.inotify = inotify_simple.INotify()
+        flags = inotify_simple.flags
+        self.mask = flags.CREATE | flags.DELETE | flags.CLOSE_WRITE | flags.MOVED_FROM | flags.MOVED_TO | \
+            flags.ATTRIB
+
+        self._lock = threading.Lock()
+        self._path_to_wd = {}
+        self._wd_to_path = {}
+
+        self._thread = threading.Thread(target=self._run, name='flaskfilemanager-inotify', daemon=True)
+        self._thread.start()
+
+    def watch(self, os_dir_path):
+        with self._lock:
+            if os_dir_path in self._path_to_wd:
+                return
+
+            try:
+                wd = self.inotify.add_watch(os_dir_path, self.mask)
+            except OSError:
+                log.exception('Failed to add inotify watch for {}'.format(os_dir_path))
+                return
+
+            self._path_to_wd[os_dir_path] = wd
+            self._wd_to_path[wd] = os_dir_path
+
+    def unwatch(self, os_dir_path):
+        with self._lock:
+            wd = self._path_to_wd.pop(os_dir_path, None)
+            if wd is None:
+                return
+
+            self._wd_to_path.pop(wd, None)
+            try:
+                self.inotify.rm_watch(wd)
+            except OSError:
+                # The directory has already been deleted
+                pass
+
+    def _run(self):
+        # (time received, OS directory path, event) waiting to be published
+        pending = collections.deque()
+
+        while True:
+            try:
+                events = self.inotify.read(timeout=int(WATCHER_DELAY * 500))
+            except Exception:
+                log.exception('Error reading inotify events')
+                time.sleep(1)
+                continue
+
+            now = time.time()
+            for event in events:
+                with self._lock:
+                    os_dir_path = self._wd_to_path.get(event.wd)
+
+                if os_dir_path is not None and event.name and not event.name.startswith(TMP_PREFIX):
+                    pending.append((now, os_dir_path, event))
+
+            while pending and now - pending[0][0] >= WATCHER_DELAY:
+                received, os_dir_path, event = pending.popleft()
+                self._publish(os_dir_path, event)
+
+    def _publish(self, os_dir_path, event):
+        flags = inotify_simple.flags
+
+        if event.mask & (flags.CREATE | flags.MOVED_TO):
+            change_type = 'create'
+        elif event.mask & (flags.DELETE | flags.MOVED_FROM):
+            change_type = 'delete'
+        else:
+            change_type = 'modify'
+
+        item = None
+        if change_type == 'delete':
+            # There's nothing left to load, so subscribers just get the id and type
+            item = {'type': 'folder' if event.mask & flags.ISDIR else 'file'}
+
+        self.feed.publish(os_dir_path, change_type, event.name, item=item, from_watcher=True)
@@ -0,0 +1,256 @@
+"""
+Content addressed deduplication of files.
+
+File contents are stored once in a content addressed store (CAS) directory, named by their SHA-256 digest,
+and hard linked into the visible tree.  The store must be on the same filesystem as the file manager root
+(hard links can't cross filesystems) but outside of it, so that the blobs aren't listed.
+
+Because every copy of a file shares the same inode, the link count of a blob tells us how many times it is
+used, so no separate index or reference count is needed.  A blob with a link count of 1 is only referenced
+by the store, and can be garbage collected.  Anything that modifies a file in place must call unshare()
+first, otherwise it would change every copy.
+
+Run this module to report savings or collect unreferenced blobs:
+
+    python -m flaskfilemanager.dedup stats /path/to/store
+    python -m flaskfilemanager.dedup gc /path/to/store
+"""
+
+import logging
+import argparse
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Temporary files older than this (in seconds) are assumed to have been abandoned by a crashed process
+TMP_MAX_AGE = 3600
+
+# The process umask, so that files written via mkstemp (which always uses 0600) can be given the same mode as
+# files created with open().  There's no way to read it without setting it, so do it once on import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class DedupStore(object):
+    def __init__(self, store_path):
+        self.store_path = os.path.abspath(store_path)
+        self.blob_dir = os.path.join(self.store_path, 'blobs')
+        self.tmp_dir = os.path.join(self.store_path, 'tmp')
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def get_blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest[2:4], digest)
+
+    def _link(self, source, dest):
+        """
+        Hard link source to dest, falling back to a copy if the two are on different filesystems
+        """
+        try:
+            os.link(source, dest)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+
+            log.warning('Unable to hard link {} to {} ({}) - copying instead'.format(source, dest, e))
+            shutil.copyfile(source, dest)
+
+    def _add_blob(self, path, digest):
+        """
+        Link the file at path into the store as the blob for digest, unless we already have that blob
+
+        :return: The path of the blob
+        """
+        blob_path = self.get_blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            try:
+                os.link(path, blob_path)
+            except FileExistsError:
+                # Someone else stored the same content at the same time
+                pass
+
+        return blob_path
+
+    def store_stream(self, stream, dest_path):
+        """
+        Write the contents of stream to dest_path, via the store.  The content is hashed as it is written, so
+        it is only read once
+
+        :return: The number of bytes written
+        """
+        hasher = hashlib.sha256()
+        size = 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            # This inode is linked into the tree, so it needs the same mode as any other upload
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+
+            digest = hasher.hexdigest()
+            try:
+                self._link(self._add_blob(tmp_path, digest), dest_path)
+            except FileNotFoundError:
+                # The blob was garbage collected between checking for it and linking it
+                self._link(self._add_blob(tmp_path, digest), dest_path)
+        finally:
+            os.remove(tmp_path)
+
+        return size
+
+    def copy(self, source, dest):
+        """
+        Copy a file without copying its contents.  If the file isn't in the store yet it is added, which
+        requires reading it once to hash it.  Can be used as the copy_function for shutil.copytree
+        """
+        source_stat = os.stat(source)
+        if source_stat.st_nlink > 1:
+            # Already deduplicated
+            self._link(source, dest)
+            return dest
+
+        if source_stat.st_dev != os.stat(self.blob_dir).st_dev:
+            # Can't be linked into the store, so don't bother hashing it
+            log.warning('{} is on a different filesystem to the store - copying instead'.format(source))
+            shutil.copyfile(source, dest)
+            return dest
+
+        hasher = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+
+        try:
+            blob_path = self._add_blob(source, hasher.hexdigest())
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+
+            log.warning('Unable to add {} to the store ({}) - copying instead'.format(source, e))
+            shutil.copyfile(source, dest)
+            return dest
+
+        self._link(blob_path, dest)
+        return dest
+
+    def copytree(self, source, dest):
+        shutil.copytree(source, dest, copy_function=self.copy)
+
+    def unshare(self, path):
+        """
+        Give the file at path its own copy of its contents, so that it can be modified in place without
+        changing any other copies
+        """
+        if os.stat(path).st_nlink <= 1:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            shutil.copy2(path, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def iter_blobs(self):
+        for dir_path, dir_names, filenames in os.walk(self.blob_dir):
+            for filename in filenames:
+                yield os.path.join(dir_path, filename)
+
+    def get_stats(self):
+        stats = {
+            'blobs': 0,
+            'unreferenced_blobs': 0,
+            'links': 0,
+            'stored_bytes': 0,
+            'logical_bytes': 0,
+            'unreferenced_bytes': 0
+        }
+
+        for blob_path in self.iter_blobs():
+            blob_stat = os.stat(blob_path)
+            links = blob_stat.st_nlink - 1
+
+            stats['blobs'] += 1
+            stats['stored_bytes'] += blob_stat.st_size
+            stats['links'] += links
+            stats['logical_bytes'] += blob_stat.st_size * links
+            if links == 0:
+                stats['unreferenced_blobs'] += 1
+                stats['unreferenced_bytes'] += blob_stat.st_size
+
+        stats['saved_bytes'] = stats['logical_bytes'] - (stats['stored_bytes'] - stats['unreferenced_bytes'])
+        return stats
+
+    def collect_garbage(self, dry_run=False):
+        """
+        Remove blobs that are no longer linked into any tree, and abandoned temporary files
+
+        :return: Tuple of (number of blobs removed, bytes freed)
+        """
+        removed = 0
+        freed = 0
+
+        for blob_path in self.iter_blobs():
+            blob_stat = os.stat(blob_path)
+            if blob_stat.st_nlink == 1:
+                log.debug('Removing unreferenced blob {}'.format(blob_path))
+                if not dry_run:
+                    os.remove(blob_path)
+                removed += 1
+                freed += blob_stat.st_size
+
+        cutoff = time.time() - TMP_MAX_AGE
+        for filename in os.listdir(self.tmp_dir):
+            tmp_path = os.path.join(self.tmp_dir, filename)
+            if os.stat(tmp_path).st_mtime < cutoff:
+                log.debug('Removing abandoned temporary file {}'.format(tmp_path))
+                if not dry_run:
+                    os.remove(tmp_path)
+
+        return removed, freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage a filemanager deduplication store')
+    parser.add_argument('command', choices=['stats', 'gc'])
+    parser.add_argument('store', help='Path to the store (FLASKFILEMANAGER_DEDUP_STORE)')
+    parser.add_argument('--dry-run', action='store_true', help="Report what gc would remove but don't remove it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    store = DedupStore(args.store)
+
+    if args.command == 'stats':
+        for key, value in sorted(store.get_stats().items()):
+            print('{:<20} {}'.format(key, value))
+    else:
+        removed, freed = store.collect_garbage(dry_run=args.dry_run)
+        print('{} {} unreferenced blobs, {} bytes'.format('Would remove' if args.dry_run else 'Removed',
+                                                         removed, freed))
+
+
+if __name__ == '__main__':
+    main()
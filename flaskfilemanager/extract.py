@@ -0,0 +1,343 @@
+"""
+Background extraction of zip and tar archives.
+
+Members are streamed straight from the archive to disk, so nothing is held in memory.  Zip members can be
+read independently, so they are extracted in parallel.  Tar archives (especially compressed ones) can only be
+read from start to finish, so they are extracted sequentially.
+
+To protect against zip bombs the number of members, total uncompressed size and ratio of uncompressed size
+to archive size are limited.  These are checked against the archive headers before anything is written
+where possible, and always enforced while writing as headers can lie.  If extraction fails for any reason
+everything written by the job is removed again.
+"""
+
+import logging
+import os
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Finished jobs are kept for this long (in seconds) so that their status can be requested
+JOB_RETENTION = 3600
+
+
+class ExtractError(Exception):
+    pass
+
+
+class ExtractJob(object):
+    def __init__(self, source, target, max_size, root=None):
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.target = target
+        self.max_size = max_size
+        self.root = root
+        self.archive_size = max(1, os.path.getsize(source))
+        self.status = 'running'
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+
+        # Top level names created in the target directory
+        self.items = []
+        # Top level names that already existed in the target directory
+        self._existing_items = set()
+        self.members = 0
+        self.bytes_written = 0
+
+        # Everything we've created, so that it can be removed if we fail
+        self._created_files = []
+        self._created_dirs = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': 'extract',
+            'attributes': {
+                'status': self.status,
+                'error': self.error,
+                'members': self.members,
+                'size': self.bytes_written,
+                'items': self.items
+            }
+        }
+
+
+class Extractor(object):
+    def __init__(self, max_size, max_members, max_ratio, threads=4, on_complete=None):
+        """
+        :param max_size: Maximum total uncompressed size of an archive in bytes
+        :param max_members: Maximum number of files and folders in an archive
+        :param max_ratio: Maximum ratio of uncompressed size to archive size
+        :param threads: Number of threads used to extract zip members in parallel
+        :param on_complete: Optional function called with each job when it finishes successfully
+        """
+        self.max_size = max_size
+        self.max_members = max_members
+        self.max_ratio = max_ratio
+        self.threads = threads
+        self.on_complete = on_complete
+
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+        self._job_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='flaskfilemanager-extract')
+        self._member_executor = ThreadPoolExecutor(max_workers=threads,
+                                                   thread_name_prefix='flaskfilemanager-extract-member')
+
+    def start(self, source, target, max_size=None, root=None):
+        """
+        Start extracting the archive at source into the directory target
+
+        :param max_size: Override the maximum total size for this job, i.e. to the remaining quota
+        :param root: The filemanager root directory that the job belongs to
+        :return: The ExtractJob
+        """
+        if max_size is None or max_size > self.max_size:
+            max_size = self.max_size
+
+        job = ExtractJob(source, target, max_size, root=root)
+
+        with self._jobs_lock:
+            self._prune_jobs()
+            self._jobs[job.id] = job
+
+        self._job_executor.submit(self._run, job)
+        return job
+
+    def get_job(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def _prune_jobs(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        log.info('Extracting {} to {}'.format(job.source, job.target))
+        try:
+            if zipfile.is_zipfile(job.source):
+                self._extract_zip(job)
+            elif tarfile.is_tarfile(job.source):
+                self._extract_tar(job)
+            else:
+                raise ExtractError('Unsupported archive format')
+
+            job.status = 'complete'
+            log.info('Extracted {} members ({} bytes) from {}'.format(job.members, job.bytes_written, job.source))
+        except Exception as e:
+            if isinstance(e, (ExtractError, zipfile.BadZipfile, tarfile.TarError)):
+                job.error = str(e)
+            else:
+                log.exception('Error extracting {}'.format(job.source))
+                job.error = 'Extraction failed: {}'.format(e)
+
+            job.status = 'failed'
+            log.warning('Extracting {} failed: {}'.format(job.source, job.error))
+            self._clean_up(job)
+
+        job.finished = time.time()
+
+        if job.status == 'complete' and self.on_complete:
+            try:
+                self.on_complete(job)
+            except Exception:
+                log.exception('Error in extract on_complete callback')
+
+        job._done.set()
+
+    def _clean_up(self, job):
+        for path in reversed(job._created_files):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        for path in reversed(job._created_dirs):
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+
+        job.items = []
+
+    def _get_dest_path(self, job, name):
+        """
+        :return: Path to extract the member with the given name to.  Raises ExtractError if the name is
+                 unsafe, i.e. absolute or outside of the target
+        """
+        parts = [p for p in name.replace('\\', '/').split('/') if p and p != '.']
+        if not parts or name.startswith('/') or '..' in parts:
+            raise ExtractError('Archive contains an unsafe path: {}'.format(name))
+
+        dest_path = os.path.join(job.target, *parts)
+        target = os.path.realpath(job.target)
+        if os.path.commonpath([target, os.path.realpath(dest_path)]) != target:
+            raise ExtractError('Archive contains an unsafe path: {}'.format(name))
+
+        return dest_path, parts[0]
+
+    def _check_limits(self, job, num_members, total_size):
+        if num_members > self.max_members:
+            raise ExtractError('Archive contains more than {} files'.format(self.max_members))
+
+        if total_size > job.max_size:
+            raise ExtractError('Archive is too large: it would extract to more than {} bytes'.format(job.max_size))
+
+        if total_size / job.archive_size > self.max_ratio:
+            raise ExtractError('Archive compression ratio is suspiciously high')
+
+    def _add_bytes(self, job, num_bytes):
+        with job._lock:
+            job.bytes_written += num_bytes
+            self._check_limits(job, job.members, job.bytes_written)
+
+    def _make_dirs(self, job, path):
+        """
+        Create path and any missing parents, recording which ones we created
+        """
+        missing = []
+        while not os.path.isdir(path):
+            missing.append(path)
+            path = os.path.dirname(path)
+
+        for path in reversed(missing):
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                continue
+
+            with job._lock:
+                job._created_dirs.append(path)
+
+    def _plan(self, job, names):
+        """
+        Work out where each member goes, and fail if any of them already exist
+
+        :return: List of destination paths, in the same order as names
+        """
+        dest_paths = []
+        for name in names:
+            dest_path, top_level = self._get_dest_path(job, name)
+            if os.path.lexists(dest_path) and not os.path.isdir(dest_path):
+                raise ExtractError('A file called {} already exists'.format(name))
+
+            dest_paths.append(dest_path)
+            self._add_item(job, top_level)
+
+        return dest_paths
+
+    def _add_item(self, job, top_level):
+        """
+        Record a top level name as a new item, unless it already existed, i.e. a folder that we're extracting
+        into
+        """
+        if top_level not in job.items and top_level not in job._existing_items:
+            if os.path.lexists(os.path.join(job.target, top_level)):
+                job._existing_items.add(top_level)
+            else:
+                job.items.append(top_level)
+
+    def _write_member(self, job, source_file, dest_path):
+        self._make_dirs(job, os.path.dirname(dest_path))
+
+        # Exclusive create, so that we never overwrite anything that appeared since we planned
+        with open(dest_path, 'xb') as dest_file:
+            with job._lock:
+                job._created_files.append(dest_path)
+
+            while True:
+                chunk = source_file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                self._add_bytes(job, len(chunk))
+                dest_file.write(chunk)
+
+    def _extract_zip(self, job):
+        with zipfile.ZipFile(job.source) as archive:
+            members = archive.infolist()
+
+        self._check_limits(job, len(members), sum(m.file_size for m in members))
+
+        dest_paths = self._plan(job, [m.filename for m in members])
+        files = []
+        for member, dest_path in zip(members, dest_paths):
+            if member.is_dir():
+                self._make_dirs(job, dest_path)
+            else:
+                files.append((member, dest_path))
+
+        job.members = len(members)
+
+        # Split the files into one batch per thread, so that each thread only opens the archive once
+        batches = [files[i::self.threads] for i in range(self.threads)]
+        futures = [self._member_executor.submit(self._extract_zip_batch, job, batch) for batch in batches if batch]
+
+        errors = [future.exception() for future in futures]
+        errors = [e for e in errors if e is not None]
+        if errors:
+            raise errors[0]
+
+    def _extract_zip_batch(self, job, batch):
+        with zipfile.ZipFile(job.source) as archive:
+            for member, dest_path in batch:
+                if job.error:
+                    return
+
+                try:
+                    with archive.open(member) as source_file:
+                        self._write_member(job, source_file, dest_path)
+                except Exception as e:
+                    # Stop the other threads
+                    job.error = str(e)
+                    raise
+
+    def _extract_tar(self, job):
+        # Stream mode, as compressed tar files can't be read out of order anyway
+        with tarfile.open(job.source, mode='r|*') as archive:
+            for member in archive:
+                job.members += 1
+                self._check_limits(job, job.members, job.bytes_written + max(0, member.size))
+
+                dest_path = self._plan_tar_member(job, member.name)
+
+                if member.isdir():
+                    self._make_dirs(job, dest_path)
+                elif member.isfile():
+                    source_file = archive.extractfile(member)
+                    self._write_member(job, source_file, dest_path)
+                else:
+                    # Links, devices, fifos etc.
+                    log.warning('Skipping unsupported tar member {}'.format(member.name))
+
+    def _plan_tar_member(self, job, name):
+        dest_path, top_level = self._get_dest_path(job, name)
+        if os.path.lexists(dest_path) and not os.path.isdir(dest_path):
+            raise ExtractError('A file called {} already exists'.format(name))
+
+        self._add_item(job, top_level)
+
+        return dest_path
+
+
+def is_archive(path):
+    return os.path.isfile(path) and (zipfile.is_zipfile(path) or tarfile.is_tarfile(path))
@@ -3,98 +3,47 @@ Main filemanager package - contains blueprint
 """
 
 import logging
+import contextlib
+import fcntl
 import json
 import os
-from collections import OrderedDict
+import queue
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import io
 import shutil
+import stat
+import tempfile
+import time
 
-from flask import Blueprint, request, make_response, send_from_directory, abort, url_for
+from flask import Blueprint, Response, request, make_response, send_file, send_from_directory, abort, url_for, g, \
+    stream_with_context
 from littlefish import util, imageutil
 import PIL.Image
 
+from .profiling import ConnectorProfiler
+from .quota import QuotaManager, get_tree_size
+from .extract import Extractor, is_archive
+from .dedup import DedupStore
+from .changefeed import ChangeFeed, RESET, TMP_PREFIX
+from .signing import UrlSigner
+from .admission import AdmissionController, AdmissionRejected
+from .variants import VariantCache, FITS, negotiate_format, render_variant
+
 __author__ = 'Stephen Brown (Little Fish Solutions LTD)'
 
 
 log = logging.getLogger(__name__)
 
-_initialised = False
-_access_control_function = None
-_custom_config_json_path = None
-_custom_init_js_path = None
-_FILE_PATH = None
-_URL_PREFIX = None
-
-filemanager_blueprint = Blueprint('flaskfilemanager', __name__, static_folder='RichFilemanager',
-                                  static_url_path='')
-
-
-def set_access_control_function(fun):
-    global _access_control_function
-    _access_control_function = fun
-
-
-def set_custom_config_json_path(filename):
-    global _custom_config_json_path
-    _custom_config_json_path = filename
-
-
-def set_custom_init_js_path(filename):
-    global _custom_init_js_path
-    _custom_init_js_path = filename
-
-
-def init(app, register_blueprint=True, url_prefix='/fm', access_control_function=None,
-         custom_config_json_path=None, custom_init_js_path=None):
-    """
-    :param app: The Flask app
-    :param register_blueprint: Override to False to stop the blueprint from automatically being registered to the
-                               app
-    :param url_prefix: The URL prefix for the blueprint, defaults to /fm
-    :param access_control_function: Pass in a function here to implement access control.  The function will
-                                    be called any time someone tries to access the filemanager, and a 404
-                                    will be returned if this function returns False
-    :param custom_config_json_path: Set this to the full path of you filemanager.config.json file if you want
-                                    to use a custom config. Example:
-                                    os.path.join(app.root_path, 'static/filemanager.config.json')
-    :param custom_init_js_path: Set this to the full path of you filemanager.init.js file if you want
-                                to use a custom init.js. Example:
-                                os.path.join(app.root_path, 'static/filemanager.init.js')
-    """
-
-    global _initialised, _FILE_PATH, _URL_PREFIX
-
-    if _initialised:
-        raise Exception('Flask Filemanager can only be registered once!')
-
-    _initialised = True
-
-    _FILE_PATH = app.config.get('FLASKFILEMANAGER_FILE_PATH')
-    if not _FILE_PATH:
-        raise Exception('No FLASKFILEMANAGER_FILE_PATH value in config')
-        
-    log.info('File Manager Using file path: {}'.format(_FILE_PATH))
-    util.ensure_dir(_FILE_PATH)
-    
-    if access_control_function:
-        set_access_control_function(access_control_function)
-
-    if custom_config_json_path:
-        set_custom_config_json_path(custom_config_json_path)
-        log.info('File Manager using custom config.json path: {}'.format(custom_config_json_path))
-
-    if custom_init_js_path:
-        set_custom_init_js_path(custom_init_js_path)
-        log.info('File Manager using custom init.js path: {}'.format(custom_init_js_path))
-
-    if register_blueprint:
-        log.info('Registering filemanager blueprint to {}'.format(url_prefix))
-        app.register_blueprint(filemanager_blueprint, url_prefix=url_prefix)
-
-
-def get_root_path():
-    return _FILE_PATH
+CONFIG_PREFIX = 'FLASKFILEMANAGER_'
+IMAGE_EXTENSIONS = ['gif', 'jpg', 'jpeg', 'png']
+# Folders with fewer entries than this are always listed sequentially
+PARALLEL_STAT_MIN_ENTRIES = 16
+# How often (in seconds) to send a comment down idle event streams, so that proxies don't close them
+EVENT_KEEPALIVE_SECONDS = 15
+# Size of the chunks that streamed savefile content is written in
+SAVE_CHUNK_SIZE = 64 * 1024
 
 
 def json_to_response(json_data, mime_type='application/json'):
@@ -121,535 +70,1327 @@ def error(message, short_name=None, code='-1'):
     }
 
 
+def get_tree_node(web_path):
+    return {
+        'id': web_path,
+        'type': 'folder',
+        'attributes': {
+            'name': os.path.split(web_path.rstrip('/'))[-1]
+        },
+        'children': None
+    }
+
+
 def web_path_to_local(path):
     return path.lstrip('/')
 
 
-def web_path_to_os_path(path):
-    return os.path.join(_FILE_PATH, web_path_to_local(path))
-
+def get_etag(file_stat):
+    """
+    :return: ETag for the version of a file, which changes whenever it is modified or replaced
+    """
+    return '{:x}-{:x}-{:x}'.format(file_stat.st_ino, file_stat.st_mtime_ns, file_stat.st_size)
 
-def get_url_path(path):
-    # TODO: refactor these fucking functions
-    return url_for('flaskfilemanager.userfile', filename='') + path.lstrip('/')
 
+@contextlib.contextmanager
+def locked_file(os_path):
+    """
+    Hold an exclusive lock on the file at os_path.  If the file is replaced while we are waiting for the lock
+    we lock the new file instead, so that whoever holds the lock always has the current version
 
-@filemanager_blueprint.route('/index.html')
-def index():
-    # Access control
-    if _access_control_function and not _access_control_function():
-        abort(404)
-    
-    return filemanager_blueprint.send_static_file('index.html')
+    :return: Context manager giving the os.stat() result for the locked file
+    """
+    while True:
+        with open(os_path, 'rb') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            file_stat = os.fstat(f.fileno())
+            if os.stat(os_path).st_ino == file_stat.st_ino:
+                yield file_stat
+                return
 
 
-@filemanager_blueprint.route('/config/filemanager.config.json')
-def filemanager_config_json():
-    if _custom_config_json_path:
-        parts = os.path.split(_custom_config_json_path)
-        return send_from_directory(parts[0], parts[1])
+def get_file_info(os_file_path):
+    """
+    Gather the filesystem metadata for a file or folder.  This doesn't use the request, so it can be called
+    from other threads
 
-    return filemanager_blueprint.send_static_file('config/filemanager.config.json')
+    :return: Dictionary of metadata, used to build the attributes in FileManager.get_file()
+    """
+    file_stat = os.stat(os_file_path)
+    extension = os_file_path.rsplit('.', 1)[-1]
 
+    height = 0
+    width = 0
+    if extension in IMAGE_EXTENSIONS:
+        try:
+            im = PIL.Image.open(os_file_path)
+            height, width = im.size
+        except OSError:
+            log.exception('Error loading image "{}" to get width and height'.format(os_file_path))
 
-@filemanager_blueprint.route('/config/filemanager.init.js')
-def filemanager_init_js():
-    if _custom_init_js_path:
-        parts = os.path.split(_custom_init_js_path)
-        return send_from_directory(parts[0], parts[1])
+    return {
+        'is_dir': stat.S_ISDIR(file_stat.st_mode),
+        'ctime': int(file_stat.st_ctime),
+        'mtime': int(file_stat.st_mtime),
+        'mtime_ns': file_stat.st_mtime_ns,
+        'size': file_stat.st_size,
+        'etag': get_etag(file_stat),
+        'readable': os.access(os_file_path, os.R_OK),
+        'writeable': os.access(os_file_path, os.W_OK),
+        'width': width,
+        'height': height
+    }
 
-    return filemanager_blueprint.send_static_file('config/filemanager.init.js')
 
+class FileManager(object):
+    """
+    A file manager, with its own blueprint, root directory, config and access control.  Multiple instances
+    can be registered to the same app as long as they have different names and URL prefixes.
+    """
 
-@filemanager_blueprint.route('/userfiles/<path:filename>')
-def userfile(filename):
-    root_dir = os.getcwd()
-    return send_from_directory(os.path.join(root_dir, _FILE_PATH), filename)
+    def __init__(self, app=None, name='flaskfilemanager', url_prefix='/fm', access_control_function=None,
+                 custom_config_json_path=None, custom_init_js_path=None, root_resolver=None, config=None,
+                 register_blueprint=True):
+        """
+        :param app: The Flask app.  If this is None, call init_app() later
+        :param name: The name of the blueprint.  This must be unique for each instance, and is used for
+                     url_for, i.e. url_for('<name>.index')
+        :param url_prefix: The URL prefix for the blueprint, defaults to /fm
+        :param access_control_function: Pass in a function here to implement access control.  The function will
+                                        be called any time someone tries to access the filemanager, and a 404
+                                        will be returned if this function returns False
+        :param custom_config_json_path: Set this to the full path of you filemanager.config.json file if you want
+                                        to use a custom config
+        :param custom_init_js_path: Set this to the full path of you filemanager.init.js file if you want
+                                    to use a custom init.js
+        :param root_resolver: Optional function which returns the root directory to use for the current
+                              request, i.e. to give each user their own directory.  If this returns None a
+                              404 will be returned.  If this is set FILE_PATH is not required
+        :param config: Optional dictionary of config values for this instance.  Keys are the same as the app
+                       config keys without the FLASKFILEMANAGER_ prefix, i.e. {'FILE_PATH': '/srv/files'},
+                       and override the values in the app config
+        :param register_blueprint: Override to False to stop the blueprint from automatically being registered
+                                   to the app
+        """
+        self.name = name
+        self.url_prefix = url_prefix
+        self.access_control_function = access_control_function
+        self.custom_config_json_path = custom_config_json_path
+        self.custom_init_js_path = custom_init_js_path
+        self.root_resolver = root_resolver
+        self.instance_config = config or {}
+
+        self.initialised = False
+        self.config = {}
+        self.file_path = None
+        self.profiler = None
+        self.quota = None
+        self.stat_executor = None
+        self.extractor = None
+        self.dedup = None
+        self.changes = None
+        self.signer = None
+        self.admission = None
+        self.rate_limit_key_function = None
+        self.variant_cache = None
+
+        # Roots returned by the root resolver that we have already created
+        self._ensured_roots = set()
+
+        self.blueprint = Blueprint(name, __name__, static_folder='RichFilemanager', static_url_path='')
+        self.blueprint.add_url_rule('/index.html', 'index', self.index)
+        self.blueprint.add_url_rule('/config/filemanager.config.json', 'filemanager_config_json',
+                                    self.filemanager_config_json)
+        self.blueprint.add_url_rule('/config/filemanager.init.js', 'filemanager_init_js', self.filemanager_init_js)
+        self.blueprint.add_url_rule('/userfiles/<path:filename>', 'userfile', self.userfile)
+
+        if app is not None:
+            self.init_app(app, register_blueprint=register_blueprint)
+
+    def init_app(self, app, register_blueprint=True):
+        if self.initialised:
+            raise Exception('Flask Filemanager {} can only be registered once!'.format(self.name))
+
+        self.initialised = True
+
+        # Instance config overrides app config
+        self.config = {
+            key[len(CONFIG_PREFIX):]: value for key, value in app.config.items() if key.startswith(CONFIG_PREFIX)
+        }
+        self.config.update(self.instance_config)
+
+        self.file_path = self.config.get('FILE_PATH')
+        if self.file_path:
+            log.info('File Manager {} using file path: {}'.format(self.name, self.file_path))
+            util.ensure_dir(self.file_path)
+        elif self.root_resolver:
+            log.info('File Manager {} using root resolver'.format(self.name))
+        else:
+            raise Exception('No FLASKFILEMANAGER_FILE_PATH value in config')
+
+        if self.custom_config_json_path:
+            log.info('File Manager using custom config.json path: {}'.format(self.custom_config_json_path))
+
+        if self.custom_init_js_path:
+            log.info('File Manager using custom init.js path: {}'.format(self.custom_init_js_path))
+
+        profile_dir = self.config.get('PROFILE_DIR')
+        if profile_dir:
+            self.profiler = ConnectorProfiler(profile_dir,
+                                              sample_rate=self.config.get('PROFILE_SAMPLE_RATE', 0.0),
+                                              trigger_key=self.config.get('PROFILE_KEY'))
+            log.info('File Manager profiling enabled, writing profiles to {}'.format(profile_dir))
+
+        admission_limits = self.config.get('ADMISSION_LIMITS')
+        rate_limit = self.config.get('RATE_LIMIT')
+        if admission_limits or rate_limit:
+            self.admission = AdmissionController(admission_limits,
+                                                 queue_size=self.config.get('ADMISSION_QUEUE_SIZE', 10),
+                                                 timeout=self.config.get('ADMISSION_TIMEOUT', 5),
+                                                 retry_after=self.config.get('ADMISSION_RETRY_AFTER', 1),
+                                                 rate=rate_limit,
+                                                 burst=self.config.get('RATE_LIMIT_BURST'))
+            self.rate_limit_key_function = self.config.get('RATE_LIMIT_KEY_FUNCTION')
+            log.info('File Manager admission control enabled: limits {}, rate limit {}'.format(admission_limits,
+                                                                                              rate_limit))
+
+        quota_bytes = self.config.get('QUOTA_BYTES')
+        if quota_bytes:
+            quota_state_file = self.config.get('QUOTA_STATE_FILE')
+            if not quota_state_file:
+                raise Exception('FLASKFILEMANAGER_QUOTA_STATE_FILE must be set when using FLASKFILEMANAGER_QUOTA_BYTES')
+
+            self.quota = QuotaManager(quota_bytes, quota_state_file,
+                                      reconcile_interval=self.config.get('QUOTA_RECONCILE_INTERVAL', 3600))
+            self.quota.start()
+            log.info('File Manager quota of {} bytes per root enabled'.format(quota_bytes))
+
+        dedup_store = self.config.get('DEDUP_STORE')
+        if dedup_store:
+            if self.file_path and not os.path.relpath(os.path.abspath(dedup_store),
+                                                       os.path.abspath(self.file_path)).startswith('..'):
+                raise Exception('FLASKFILEMANAGER_DEDUP_STORE must not be inside FLASKFILEMANAGER_FILE_PATH')
+
+            self.dedup = DedupStore(dedup_store)
+
+            # Hard links can't cross filesystems, so everything would just be copied
+            if self.file_path and os.stat(self.file_path).st_dev != os.stat(self.dedup.blob_dir).st_dev:
+                raise Exception('FLASKFILEMANAGER_DEDUP_STORE must be on the same filesystem as '
+                                'FLASKFILEMANAGER_FILE_PATH')
+            log.info('File Manager deduplicating files into {}'.format(dedup_store))
+
+        url_signing_key = self.config.get('URL_SIGNING_KEY')
+        if url_signing_key:
+            self.signer = UrlSigner(url_signing_key, expiry=self.config.get('URL_EXPIRY', 3600))
+            self.blueprint.add_url_rule('/signed/<token>/userfiles/<path:filename>', 'signed_userfile',
+                                        self.signed_userfile)
+            self.blueprint.add_url_rule('/signed/<token>/thumbnails/<path:filename>', 'signed_thumbnail',
+                                        self.signed_thumbnail)
+            log.info('File Manager using signed URLs')
+
+        variant_cache_dir = self.config.get('VARIANT_CACHE_DIR')
+        if variant_cache_dir:
+            self.variant_cache = VariantCache(variant_cache_dir,
+                                              self.config.get('VARIANT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+            log.info('File Manager caching image variants in {}'.format(variant_cache_dir))
+
+        if self.config.get('CHANGE_FEED'):
+            self.changes = ChangeFeed(use_inotify=self.config.get('CHANGE_FEED_INOTIFY', True))
+            self.blueprint.add_url_rule('/connectors/py/events', 'events', self.events)
+            log.info('File Manager change feed enabled')
+
+        self.extractor = Extractor(max_size=self.config.get('EXTRACT_MAX_SIZE', 1024 * 1024 * 1024),
+                                   max_members=self.config.get('EXTRACT_MAX_MEMBERS', 10000),
+                                   max_ratio=self.config.get('EXTRACT_MAX_RATIO', 100),
+                                   threads=self.config.get('EXTRACT_THREADS', 4),
+                                   on_complete=self.on_extract_complete)
+
+        parallel_stat_workers = self.config.get('PARALLEL_STAT_WORKERS')
+        if parallel_stat_workers:
+            self.stat_executor = ThreadPoolExecutor(max_workers=parallel_stat_workers,
+                                                    thread_name_prefix='flaskfilemanager-{}-stat'.format(self.name))
+            log.info('File Manager listing folders with {} stat threads'.format(parallel_stat_workers))
+
+        self.blueprint.add_url_rule('/connectors/py/filemanager.py', 'connector', self.connector)
+        self.blueprint.add_url_rule('/connectors/py/filemanager.py', 'post_connector', self.post_connector,
+                                    methods=['POST'])
+
+        if register_blueprint:
+            log.info('Registering filemanager blueprint {} to {}'.format(self.name, self.url_prefix))
+            app.register_blueprint(self.blueprint, url_prefix=self.url_prefix)
+
+    def check_access(self):
+        if self.access_control_function and not self.access_control_function():
+            abort(404)
+
+    def get_root_path(self):
+        if not self.root_resolver:
+            return self.file_path
+
+        # The resolver may be expensive (i.e. a database lookup) so only call it once per request
+        roots = g.setdefault('_flaskfilemanager_roots', {})
+        if self.name not in roots:
+            root = self.root_resolver()
+            if not root:
+                abort(404)
+
+            if root not in self._ensured_roots:
+                util.ensure_dir(root)
+                self._ensured_roots.add(root)
+
+            roots[self.name] = root
+
+        return roots[self.name]
+
+    def web_path_to_os_path(self, path):
+        return os.path.join(self.get_root_path(), web_path_to_local(path))
+
+    def get_url_path(self, path):
+        return url_for('{}.userfile'.format(self.name), filename='') + path.lstrip('/')
+
+    def get_signed_url(self, kind, path, version=None):
+        """
+        :param kind: 'userfile' or 'thumbnail'
+        """
+        filename = web_path_to_local(path)
+        # With a root resolver the root can't be worked out from the signed request, so it goes in the token
+        root = self.get_root_path() if self.root_resolver else None
+        token = self.signer.get_token(kind, filename, root=root, version=version)
+        return url_for('{}.signed_{}'.format(self.name, kind), token=token, filename=filename)
+
+    def verify_signed_request(self, token, kind, filename):
+        """
+        Check the signature of a signed URL, aborting with a 404 if it is invalid
+
+        :return: Tuple of (OS path of the file, root directory, expiry time)
+        """
+        result = self.signer.verify_token(token, kind, filename)
+        if result is None:
+            abort(404)
+
+        root, expires = result
+        if not self.root_resolver:
+            root = self.file_path
+        elif not root:
+            abort(404)
+
+        os_path = os.path.join(root, filename)
+        real_root = os.path.realpath(root)
+        if os.path.commonpath([real_root, os.path.realpath(os_path)]) != real_root:
+            abort(404)
+
+        return os_path, root, expires
+
+    def make_cacheable(self, response, expires):
+        """
+        Allow shared caches to keep a signed response until its URL expires
+        """
+        # send_from_directory() sets no-cache on newer versions of Flask, and an Expires header based on the
+        # default max age on older ones, neither of which apply to a signed URL
+        response.cache_control.pop('no-cache', None)
+        response.cache_control.public = True
+        response.cache_control.max_age = max(0, int(expires - time.time()))
+        response.expires = expires
+        return response
 
+    def index(self):
+        self.check_access()
+        return self.blueprint.send_static_file('index.html')
+
+    def filemanager_config_json(self):
+        if self.custom_config_json_path:
+            parts = os.path.split(self.custom_config_json_path)
+            return send_from_directory(parts[0], parts[1])
+
+        return self.blueprint.send_static_file('config/filemanager.config.json')
+
+    def filemanager_init_js(self):
+        if self.custom_init_js_path:
+            parts = os.path.split(self.custom_init_js_path)
+            return send_from_directory(parts[0], parts[1])
+
+        return self.blueprint.send_static_file('config/filemanager.init.js')
+
+    def userfile(self, filename):
+        # Unsigned URLs are only allowed for people who could use the file manager if signing is enabled
+        if self.signer:
+            self.check_access()
+
+        root_dir = os.getcwd()
+        return send_from_directory(os.path.join(root_dir, self.get_root_path()), filename)
+
+    def signed_userfile(self, token, filename):
+        os_path, root, expires = self.verify_signed_request(token, 'userfile', filename)
+        return self.make_cacheable(send_from_directory(os.path.abspath(root), filename), expires)
+
+    def signed_thumbnail(self, token, filename):
+        # Rendering thumbnails is expensive, so these are subject to the same admission control as getimage
+        return self.dispatch('getimage', lambda mode: self.get_signed_thumbnail(token, filename))
+
+    def get_signed_thumbnail(self, token, filename):
+        os_path, root, expires = self.verify_signed_request(token, 'thumbnail', filename)
+        if not os.path.isfile(os_path):
+            abort(404)
+
+        return self.make_cacheable(self.get_thumbnail_response(os_path), expires)
+
+    def connector(self):
+        self.check_access()
+
+        log.debug(request.args)
+
+        mode = request.args.get('mode')
+
+        return self.dispatch(mode, self.get_connector_response)
+
+    def get_connector_response(self, mode):
+        resp = None
+
+        if mode == 'initiate':
+            resp = self.initiate()
+        elif mode == 'getfolder':
+            resp = self.get_folder()
+        elif mode == 'getfile':
+            resp = self.get_file()
+        elif mode == 'gettree':
+            return self.get_tree()
+        elif mode == 'addfolder':
+            resp = self.add_folder()
+        elif mode == 'rename':
+            resp = self.rename_file()
+        elif mode == 'move':
+            resp = self.move_file()
+        elif mode == 'copy':
+            resp = self.copy_file()
+        elif mode == 'editfile':
+            resp = self.edit_file()
+        elif mode == 'delete':
+            resp = self.delete_file()
+        elif mode == 'download':
+            if request.is_xhr:
+                # This is really stupid - I don't get why it does this!
+                resp = self.get_file()
+            else:
+                return self.download_file()
+        elif mode == 'getimage':
+            return self.get_image()
+        elif mode == 'extractstatus':
+            resp = self.get_extract_status()
+        elif mode == 'readfile':
+            resp = error('Non implemented: readfile')
+        elif mode == 'summarize':
+            resp = error('Non implemented: summarize')
+
+        if resp is not None:
+            if 'errors' in resp:
+                return dict_to_response(resp)
+
+            return dict_to_response({'data': resp})
+
+        return dict_to_response(error('Unknown GET mode: %s' % mode))
+
+    def post_connector(self):
+        self.check_access()
+
+        # Rate limit before the body is parsed, as parsing an upload is one of the most expensive things we do
+        if self.admission:
+            try:
+                self.admission.check_rate(self.get_client_key())
+            except AdmissionRejected as e:
+                return self.admission_error(e)
+
+        # Reject uploads that can't possibly fit before the body is parsed, which would write the files to
+        # temporary storage.  The frontend puts the mode in the query string for uploads so that we can tell
+        # what they are before parsing.  Other modes (i.e. savefile) replace existing content, so only their
+        # net size change counts, which they check themselves
+        if self.quota and request.args.get('mode') == 'upload' and request.content_length and \
+                not self.quota.has_space(self.get_root_path(), request.content_length):
+            return dict_to_response(self.quota_error(request.content_length))
+
+        log.debug('POST: %s' % request.form)
+        log.debug('files: %s' % request.files)
+
+        mode = request.form.get('mode')
+
+        return self.dispatch(mode, self.post_connector_response, check_rate=False)
+
+    def dispatch(self, mode, fun, check_rate=True):
+        """
+        Call fun(mode) to build the response, subject to admission control and profiling.  Responses that
+        stream a file (i.e. downloads) release their admission slot before the file is sent
+        """
+        if self.admission:
+            try:
+                if check_rate:
+                    self.admission.check_rate(self.get_client_key())
+
+                slot = self.admission.admit(mode)
+            except AdmissionRejected as e:
+                return self.admission_error(e)
+
+            with slot:
+                return self.run_profiled(mode, fun)
+
+        return self.run_profiled(mode, fun)
+
+    def run_profiled(self, mode, fun):
+        if self.profiler:
+            return self.profiler.profile(mode, fun, mode)
+
+        return fun(mode)
+
+    def get_client_key(self):
+        if self.rate_limit_key_function:
+            return self.rate_limit_key_function()
+
+        return request.remote_addr
+
+    def admission_error(self, e):
+        response = dict_to_response(error(e.message, code=str(e.status_code)))
+        response.status_code = e.status_code
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
 
-@filemanager_blueprint.route('/connectors/py/filemanager.py')
-def connector():
-    # Access control
-    if _access_control_function and not _access_control_function():
-        abort(404)
+    def post_connector_response(self, mode):
+        resp = None
+
+        if mode == 'upload':
+            resp = self.upload_file()
+        elif mode == 'savefile':
+            return self.save_file()
+        elif mode == 'extract':
+            return self.extract_file()
+
+        if resp is not None:
+            if 'errors' in resp:
+                return dict_to_response(resp)
+
+            return dict_to_response({'data': resp})
+
+        return dict_to_response(error('Unknown POST mode: %s' % mode))
+
+    def events(self):
+        """
+        Server-sent event stream of changes to the folder in the path parameter.  Each event has the type of
+        change (create, modify, rename or delete) as its event name, and a JSON object containing the item
+        (in the same format as getfile) and, for renames, the old id
+        """
+        self.check_access()
+
+        web_path = request.args.get('path')
+        if not web_path:
+            abort(400)
+
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.isdir(os_path):
+            abort(404)
+
+        subscriber = self.changes.subscribe(os_path)
+
+        def generate():
+            try:
+                # Tell the client how long to wait before reconnecting
+                yield 'retry: 5000\n\n'
+
+                while True:
+                    try:
+                        event = subscriber.get(timeout=EVENT_KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield ': keepalive\n\n'
+                        continue
+
+                    if event == RESET:
+                        yield 'event: reset\ndata: {}\n\n'
+                        continue
+
+                    data = self.get_event_data(web_path, event)
+                    if data is not None:
+                        yield 'event: {}\ndata: {}\n\n'.format(event['type'], json.dumps(data))
+            finally:
+                self.changes.unsubscribe(os_path, subscriber)
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx from buffering the stream
+            'X-Accel-Buffering': 'no'
+        })
+
+    def get_event_data(self, web_path, event):
+        item_path = os.path.join(web_path, event['name'])
+        item = event['item']
+
+        if item is None:
+            try:
+                item = self.get_file(item_path)
+            except OSError:
+                # It's gone again already - there will be another event for that
+                return None
+        else:
+            # Shared between subscribers, so don't modify it
+            item = dict(item)
+
+        item['id'] = item_path + '/' if item['type'] == 'folder' else item_path
+        data = {'item': item}
+
+        if event['old_name']:
+            data['oldId'] = os.path.join(web_path, event['old_name'])
+            if item['type'] == 'folder':
+                data['oldId'] += '/'
+
+        return data
+
+    def publish_change(self, os_path, change_type, item=None, old_os_path=None):
+        """
+        Tell anyone watching the folder containing os_path about a change to it
+        """
+        if not self.changes:
+            return
+
+        os_dir_path, name = os.path.split(os_path.rstrip('/'))
+        old_name = os.path.split(old_os_path.rstrip('/'))[-1] if old_os_path else None
+        self.changes.publish(os_dir_path, change_type, name, item=item, old_name=old_name)
+
+    def quota_error(self, size):
+        return error('Quota exceeded: {} bytes required but only {} bytes remaining'.format(
+            size, self.quota.get_remaining(self.get_root_path())))
+
+    def initiate(self):
+        return {
+            'id': '/',
+            'type': 'initiate',
+            'attributes': {
+                'config': {
+                    'options': {
+                        'culture': 'en'
+                    },
+                    'security': {
+                        'allowFolderDownload': True,
+                        'readOnly': False,
+                        'extensions': {
+                            'ignoreCase': False,
+                            'policy': 'DISALLOW_LIST',
+                            'restrictions': []
+                        }
+                    }
+                }
+            }
+        }
 
-    log.debug(request.args)
+    def get_file(self, path=None, content=None, info=None):
+        """
+        :param path: relative path, or None to get from request
+        :param content: file content, output in data. Used for editfile
+        :param info: result of get_file_info() for the path, if it has already been loaded
+        """
+        if path is None:
+            path = request.args.get('path')
+
+        if path is None:
+            return error('No path in request')
+    
+        filename = os.path.split(path.rstrip('/'))[-1]
 
-    mode = request.args.get('mode')
+        if info is None:
+            info = get_file_info(self.web_path_to_os_path(path))
 
-    resp = None
-    
-    if mode == 'initiate':
-        resp = initiate()
-    elif mode == 'getfolder':
-        resp = get_folder()
-    elif mode == 'getfile':
-        resp = get_file()
-    elif mode == 'addfolder':
-        resp = add_folder()
-    elif mode == 'rename':
-        resp = rename_file()
-    elif mode == 'move':
-        resp = move_file()
-    elif mode == 'copy':
-        resp = copy_file()
-    elif mode == 'editfile':
-        resp = edit_file()
-    elif mode == 'delete':
-        resp = delete_file()
-    elif mode == 'download':
-        if request.is_xhr:
-            # This is really stupid - I don't get why it does this!
-            resp = get_file()
+        if info['is_dir']:
+            file_type = 'folder'
+            # Ensure trailing slash
+            if path[-1] != '/':
+                path += '/'
         else:
-            return download_file()
-    elif mode == 'getimage':
-        return get_image()
-    elif mode == 'readfile':
-        resp = error('Non implemented: readfile')
-    elif mode == 'summarize':
-        resp = error('Non implemented: summarize')
-
-    if resp is not None:
-        if 'errors' in resp:
-            return dict_to_response(resp)
+            file_type = 'file'
 
-        return dict_to_response({'data': resp})
+        # Signed responses are cached, so their URLs have to change whenever the content might have
+        if self.signer and file_type == 'file':
+            version = '{:x}-{:x}'.format(info['mtime_ns'], info['size'])
+            url_path = self.get_signed_url('userfile', path, version=version)
+        else:
+            url_path = self.get_url_path(path)
+
+        attributes = {
+            'name': filename,
+            'path': url_path,
+            'readable': 1 if info['readable'] else 0,
+            'writeable': 1 if info['writeable'] else 0,
+            'created': datetime.datetime.fromtimestamp(info['ctime']).ctime(),
+            'modified': datetime.datetime.fromtimestamp(info['mtime']).ctime(),
+            'timestamp': info['mtime'],
+            'width': info['width'],
+            'height': info['height'],
+            'size': info['size']
+        }
 
-    return dict_to_response(error('Unknown GET mode: %s' % mode))
+        if file_type == 'file':
+            attributes['etag'] = info['etag']
 
+        if self.signer and file_type == 'file' and filename.rsplit('.', 1)[-1].lower() in IMAGE_EXTENSIONS:
+            attributes['thumbnail'] = self.get_signed_url('thumbnail', path, version=version)
 
-@filemanager_blueprint.route('/connectors/py/filemanager.py', methods=['POST'])
-def post_connector():
-    # Access control
-    if _access_control_function and not _access_control_function():
-        abort(404)
+        if content:
+            attributes['content'] = content
 
-    log.debug('POST: %s' % request.form)
-    log.debug('files: %s' % request.files)
+        return {
+            'id': path,
+            'type': file_type,
+            'attributes': attributes
+        }
 
-    mode = request.form.get('mode')
+    def edit_file(self):
+        path = request.args.get('path')
+    
+        if path is None:
+            return error('No path in request')
+    
+        os_file_path = self.web_path_to_os_path(path)
+    
+        # Load the contents of the file
+        content = util.read_file(os_file_path).decode()
+        return self.get_file(path=path, content=content)
+
+    def get_folder(self):
+        web_path = request.args.get('path')
+        if not web_path:
+            return error('No path in request')
+
+        # Load the files.  scandir can usually tell us which entries are folders without a stat call
+        os_path = self.web_path_to_os_path(web_path)
+        with os.scandir(os_path) as entries:
+            file_list = [(entry.name, entry.is_dir()) for entry in entries if not entry.name.startswith(TMP_PREFIX)]
+
+        # Folders first, then files, both in case insensitive order
+        file_list.sort(key=lambda f: (not f[1], f[0].lower()))
+        names = [f[0] for f in file_list]
+        os_paths = [os.path.join(os_path, f) for f in names]
+
+        if self.stat_executor and len(names) >= PARALLEL_STAT_MIN_ENTRIES:
+            # On high latency filesystems the stat calls dominate, so make them in parallel.  map() returns
+            # the results in the same order as the input
+            infos = self.stat_executor.map(get_file_info, os_paths)
+        else:
+            infos = map(get_file_info, os_paths)
 
-    resp = None
+        out = OrderedDict()
 
-    if mode == 'upload':
-        resp = upload_file()
-    elif mode == 'savefile':
-        resp = save_file()
-    elif mode == 'extract':
-        resp = error('Non implemented: extract')
+        for f, info in zip(names, infos):
+            wpath = os.path.join(web_path, f)
+            out[wpath] = self.get_file(wpath, info=info)
 
-    if resp is not None:
-        if 'errors' in resp:
-            return dict_to_response(resp)
+        return out
 
-        return dict_to_response({'data': resp})
+    def get_tree(self):
+        """
+        Load the folder hierarchy under path, down to depth levels, in one request for the filetree panel.
+        Only folder names are loaded, so this is much cheaper than a getfolder call per folder.  Folders are
+        loaded breadth first until the TREE_MAX_NODES limit is reached.  Folders whose children weren't
+        loaded, because they are too deep or the limit was reached, have children set to None
+        """
+        web_path = request.args.get('path', '/')
+        if not web_path.endswith('/'):
+            web_path += '/'
 
-    return dict_to_response(error('Unknown POST mode: %s' % mode))
+        try:
+            depth = max(1, int(request.args.get('depth', 1)))
+        except ValueError:
+            return dict_to_response(error('Invalid depth'))
+
+        max_nodes = self.config.get('TREE_MAX_NODES', 5000)
+
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.isdir(os_path):
+            return dict_to_response(error('Path %s is not a directory' % web_path))
+
+        tree = get_tree_node(web_path)
+        pending = deque([(tree, os_path, 1)])
+        num_nodes = 0
+        truncated = False
+
+        while pending:
+            node, node_os_path, level = pending.popleft()
+
+            try:
+                with os.scandir(node_os_path) as entries:
+                    folders = [(entry.name, entry.is_symlink()) for entry in entries if entry.is_dir()]
+            except OSError as e:
+                log.warning('Failed to list %s: %s' % (node_os_path, e))
+                continue
+
+            if num_nodes + len(folders) > max_nodes:
+                truncated = True
+                break
+
+            folders.sort(key=lambda f: f[0].lower())
+            num_nodes += len(folders)
+            node['children'] = []
+
+            for name, is_symlink in folders:
+                child = get_tree_node(node['id'] + name + '/')
+                node['children'].append(child)
+
+                # Don't follow symlinks, as they could form a loop
+                if level < depth and not is_symlink:
+                    pending.append((child, os.path.join(node_os_path, name), level + 1))
+
+        return dict_to_response({
+            'data': tree,
+            'meta': {
+                'depth': depth,
+                'nodes': num_nodes,
+                'truncated': truncated
+            }
+        })
 
+    def rename_file(self):
+        web_old_path = request.args.get('old')
+        if not web_old_path:
+            return error('No old path specified')
 
-def initiate():
-    return {
-        'id': '/',
-        'type': 'initiate',
-        'attributes': {
-            'config': {
-                'options': {
-                    'culture': 'en'
-                },
-                'security': {
-                    'allowFolderDownload': True,
-                    'readOnly': False,
-                    'extensions': {
-                        'ignoreCase': False,
-                        'policy': 'DISALLOW_LIST',
-                        'restrictions': []
-                    }
-                }
-            }
-        }
-    }
+        new_name = request.args.get('new')
+        if not new_name:
+            return error('No new name specified')
 
+        old_name = os.path.split(web_old_path)[-1]
 
-def get_file(path=None, content=None):
-    """
-    :param path: relative path, or None to get from request
-    :param content: file content, output in data. Used for editfile
-    """
-    if path is None:
-        path = request.args.get('path')
+        if old_name == new_name:
+            return error('Old name and new name are the same!')
 
-    if path is None:
-        return error('No path in request')
+        os_old_path = self.web_path_to_os_path(web_old_path)
+        path_parts = os.path.split(os_old_path)
+        os_new_path = os.path.join(*path_parts[:-1])
+        os_new_path = os.path.join(os_new_path, new_name)
     
-    filename = os.path.split(path.rstrip('/'))[-1]
-    extension = filename.rsplit('.', 1)[-1]
-    os_file_path = web_path_to_os_path(path)
+        web_path_parts = os.path.split(web_old_path)
+        web_new_path = os.path.join(*web_path_parts[:-1])
+        web_new_path = os.path.join(web_new_path, new_name)
 
-    if os.path.isdir(os_file_path):
-        file_type = 'folder'
-        # Ensure trailing slash
-        if path[-1] != '/':
-            path += '/'
-    else:
-        file_type = 'file'
+        # Check if the new file exists already
+        if os.path.exists(os_new_path):
+            return error('A file with that name (%s) already exists' % new_name)
 
-    ctime = int(os.path.getctime(os_file_path))
-    mtime = int(os.path.getmtime(os_file_path))
-
-    height = 0
-    width = 0
-    if extension in ['gif', 'jpg', 'jpeg', 'png']:
+        # Looks like we're good to go!
         try:
-            im = PIL.Image.open(os_file_path)
-            height, width = im.size
-        except OSError:
-            log.exception('Error loading image "{}" to get width and height'.format(os_file_path))
-    
-    attributes = {
-        'name': filename,
-        'path': get_url_path(path),
-        'readable': 1 if os.access(os_file_path, os.R_OK) else 0,
-        'writeable': 1 if os.access(os_file_path, os.W_OK) else 0,
-        'created': datetime.datetime.fromtimestamp(ctime).ctime(),
-        'modified': datetime.datetime.fromtimestamp(mtime).ctime(),
-        'timestamp': mtime,
-        'width': width,
-        'height': height,
-        'size': os.path.getsize(os_file_path)
-    }
+            os.rename(os_old_path, os_new_path)
+        except Exception as e:
+            return error('Operation failed: %s' % e)
 
-    if content:
-        attributes['content'] = content
+        item = self.get_file(web_new_path)
+        self.publish_change(os_new_path, 'rename', item, old_os_path=os_old_path)
+        return item
 
-    return {
-        'id': path,
-        'type': file_type,
-        'attributes': attributes
-    }
+    def move_file(self):
+        web_old_path = request.args.get('old')
+        if not web_old_path:
+            return error('No old path specified')
 
+        web_new_path = request.args.get('new')
+        if not web_new_path:
+            return error('No new path specified')
 
-def edit_file():
-    path = request.args.get('path')
-    
-    if path is None:
-        return error('No path in request')
+        os_old_path = self.web_path_to_os_path(web_old_path)
+        os_new_path = self.web_path_to_os_path(web_new_path)
     
-    os_file_path = web_path_to_os_path(path)
-    
-    # Load the contents of the file
-    content = util.read_file(os_file_path).decode()
-    return get_file(path=path, content=content)
-
+        # Old path may be a directory, or a file.  It is the thing to be moved
+        old_name = os.path.split(os_old_path.rstrip('/'))[-1]
+        os_new_path = os.path.join(os_new_path, old_name)
 
-def get_folder():
-    web_path = request.args.get('path')
-    if not web_path:
-        return error('No path in request')
+        # Check if the new file exists already
+        if os.path.exists(os_new_path):
+            return error('A file with that name (%s) already exists' % os_new_path)
 
-    # Load the files
-    os_path = web_path_to_os_path(web_path)
-    file_list = os.listdir(os_path)
+        # Looks like we're good to go!
+        try:
+            os.rename(os_old_path, os_new_path)
+        except Exception as e:
+            return error('Operation failed: %s' % e)
 
-    file_list.sort(key=lambda s: s.lower())
-    out = OrderedDict()
+        item = self.get_file(os.path.join(web_new_path, old_name))
+        self.publish_change(os_old_path, 'delete', {'type': item['type']})
+        self.publish_change(os_new_path, 'create', item)
+        return item
 
-    for f in file_list:
-        if os.path.isdir(os.path.join(os_path, f)):
-            wpath = os.path.join(web_path, f)
-            out[wpath] = get_file(wpath)
+    def copy_file(self):
+        web_old_path = request.args.get('source')
+        if not web_old_path:
+            return error('No old path specified')
 
-    for f in file_list:
-        if not os.path.isdir(os.path.join(os_path, f)):
-            wpath = os.path.join(web_path, f)
-            out[wpath] = get_file(wpath)
+        web_new_path = request.args.get('target')
+        if not web_new_path:
+            return error('No new path specified')
 
-    return out
+        os_old_path = self.web_path_to_os_path(web_old_path)
+        os_new_dir_path = self.web_path_to_os_path(web_new_path)
+    
+        # Old path may be a directory, or a file.  It is the thing to be moved
+        old_name = os.path.split(os_old_path.rstrip('/'))[-1]
+        os_new_path = os.path.join(os_new_dir_path, old_name)
 
+        # Check if the new file exists already
+        if os.path.exists(os_new_path):
+            return error('A file with that name (%s) already exists' % os_new_path)
 
-def rename_file():
-    web_old_path = request.args.get('old')
-    if not web_old_path:
-        return error('No old path specified')
+        if self.quota:
+            size = get_tree_size(os_old_path)
+            if not self.quota.has_space(self.get_root_path(), size):
+                return self.quota_error(size)
 
-    new_name = request.args.get('new')
-    if not new_name:
-        return error('No new name specified')
+        # Looks like we're good to go!
+        try:
+            if self.dedup:
+                if os.path.isdir(os_old_path):
+                    self.dedup.copytree(os_old_path, os_new_path)
+                else:
+                    self.dedup.copy(os_old_path, os_new_path)
+            elif os.path.isdir(os_old_path):
+                shutil.copytree(os_old_path, os_new_path)
+            else:
+                shutil.copy(os_old_path, os_new_dir_path)
+        except Exception as e:
+            return error('Operation failed: %s' % e)
 
-    old_name = os.path.split(web_old_path)[-1]
+        if self.quota:
+            self.quota.add(self.get_root_path(), size)
 
-    if old_name == new_name:
-        return error('Old name and new name are the same!')
+        item = self.get_file(os.path.join(web_new_path, old_name))
+        self.publish_change(os_new_path, 'create', item)
+        return item
 
-    os_old_path = web_path_to_os_path(web_old_path)
-    path_parts = os.path.split(os_old_path)
-    os_new_path = os.path.join(*path_parts[:-1])
-    os_new_path = os.path.join(os_new_path, new_name)
-    
-    web_path_parts = os.path.split(web_old_path)
-    web_new_path = os.path.join(*web_path_parts[:-1])
-    web_new_path = os.path.join(web_new_path, new_name)
+    def add_folder(self):
+        web_path = request.args.get('path')
+        if not web_path:
+            return error('No path specified')
 
-    # Check if the new file exists already
-    if os.path.exists(os_new_path):
-        return error('A file with that name (%s) already exists' % new_name)
+        name = request.args.get('name')
+        if not name:
+            return error('No name for new folder')
 
-    # Looks like we're good to go!
-    try:
-        os.rename(os_old_path, os_new_path)
-    except Exception as e:
-        return error('Operation failed: %s' % e)
+        os_path = self.web_path_to_os_path(web_path)
 
-    return get_file(web_new_path)
+        if not os.path.exists(os_path):
+            return error('Path %s doesn\'t exist' % web_path)
 
+        if not os.path.isdir(os_path):
+            return error('Path %s is not a directory' % web_path)
 
-def move_file():
-    web_old_path = request.args.get('old')
-    if not web_old_path:
-        return error('No old path specified')
+        os_new_path = os.path.join(os_path, name)
+        if os.path.exists(os_new_path):
+            return error('File already exists')
 
-    web_new_path = request.args.get('new')
-    if not web_new_path:
-        return error('No new path specified')
+        try:
+            os.mkdir(os_new_path)
+        except Exception as e:
+            return error('Operation failed: %s' % e)
 
-    os_old_path = web_path_to_os_path(web_old_path)
-    os_new_path = web_path_to_os_path(web_new_path)
-    
-    # Old path may be a directory, or a file.  It is the thing to be moved
-    old_name = os.path.split(os_old_path.rstrip('/'))[-1]
-    os_new_path = os.path.join(os_new_path, old_name)
+        item = self.get_file(os.path.join(web_path, name))
+        self.publish_change(os_new_path, 'create', item)
+        return item
 
-    # Check if the new file exists already
-    if os.path.exists(os_new_path):
-        return error('A file with that name (%s) already exists' % os_new_path)
+    def upload_file(self):
+        # This is supposed to handle multiple files, but the frontend only ever seems to send 1...
+        web_path = request.form.get('path')
+        if not web_path:
+            return error('No path in query')
 
-    # Looks like we're good to go!
-    try:
-        os.rename(os_old_path, os_new_path)
-    except Exception as e:
-        return error('Operation failed: %s' % e)
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.exists(os_path):
+            return error('Path %s doesn\'t exist' % web_path)
 
-    return get_file(os.path.join(web_new_path, old_name))
+        if not os.path.isdir(os_path):
+            return error('Path %s is not a directory' % web_path)
 
+        # Get uploaded file
+        uploaded_file = request.files['files']
+        filename = uploaded_file.filename
 
-def copy_file():
-    web_old_path = request.args.get('source')
-    if not web_old_path:
-        return error('No old path specified')
+        os_dest_path = os.path.join(os_path, filename)
+        if os.path.exists(os_dest_path):
+            return error('Upload failed: file %s already exists' % os_dest_path)
 
-    web_new_path = request.args.get('target')
-    if not web_new_path:
-        return error('No new path specified')
+        if self.dedup:
+            log.info('Uploading file to {} via dedup store'.format(os_dest_path))
+            size = self.dedup.store_stream(uploaded_file.stream, os_dest_path)
 
-    os_old_path = web_path_to_os_path(web_old_path)
-    os_new_dir_path = web_path_to_os_path(web_new_path)
-    
-    # Old path may be a directory, or a file.  It is the thing to be moved
-    old_name = os.path.split(os_old_path.rstrip('/'))[-1]
-    os_new_path = os.path.join(os_new_dir_path, old_name)
-
-    # Check if the new file exists already
-    if os.path.exists(os_new_path):
-        return error('A file with that name (%s) already exists' % os_new_path)
-
-    # Looks like we're good to go!
-    try:
-        if os.path.isdir(os_old_path):
-            shutil.copytree(os_old_path, os_new_path)
+            # We can only check the actual size after storing it, for clients that didn't send a content length
+            if self.quota and not self.quota.has_space(self.get_root_path(), size):
+                os.remove(os_dest_path)
+                return self.quota_error(size)
         else:
-            shutil.copy(os_old_path, os_new_dir_path)
-    except Exception as e:
-        return error('Operation failed: %s' % e)
+            # Read the file into memory
+            data = uploaded_file.read()
+            size = len(data)
+
+            # This will already have been checked against the content length, if the client sent one
+            if self.quota and not self.quota.has_space(self.get_root_path(), size):
+                return self.quota_error(size)
+
+            log.info('Uploading file to {}'.format(os_dest_path))
+            with open(os_dest_path, 'wb') as f:
+                f.write(data)
+
+        if self.quota:
+            self.quota.add(self.get_root_path(), size)
+
+        item = self.get_file(os.path.join(web_path, filename))
+        self.publish_change(os_dest_path, 'create', item)
+        return [item]
+
+    def save_file(self):
+        """
+        Replace the contents of a file.  The new content is written to a temporary file in the same folder and
+        then renamed over the original, so a crash can never leave the file half written.  The content can be
+        sent as a form field, or as a file part which is streamed to disk.
+
+        If the request has an If-Match header, or an etag or mtime form field, and the file has changed since
+        that version the save is refused with a 409 conflict
+        """
+        # This is supposed to handle multiple files, but the frontend only ever seems to send 1...
+        web_path = request.form.get('path')
+        if not web_path:
+            return dict_to_response(error('No path in query'))
+
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.exists(os_path):
+            return dict_to_response(error('Path %s doesn\'t exist' % web_path))
+
+        if os.path.isdir(os_path):
+            return dict_to_response(error('Path %s is a directory' % web_path))
+
+        content_file = request.files.get('content')
+        content = request.form.get('content')
+        if content_file is None and content is None:
+            return dict_to_response(error('No content'))
+
+        # Write the new content before taking the lock, so that we hold it for as short a time as possible
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os_path), prefix=TMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if content_file is not None:
+                    shutil.copyfileobj(content_file.stream, f, SAVE_CHUNK_SIZE)
+                else:
+                    f.write(content.encode())
+
+                f.flush()
+                os.fsync(f.fileno())
+
+            try:
+                with locked_file(os_path) as file_stat:
+                    if not self.check_save_precondition(file_stat):
+                        response = dict_to_response(error('%s has been changed since it was loaded' % web_path,
+                                                          code='409'))
+                        response.status_code = 409
+                        return response
+
+                    size_change = os.path.getsize(tmp_path) - file_stat.st_size
+                    if self.quota and not self.quota.has_space(self.get_root_path(), size_change):
+                        return dict_to_response(self.quota_error(size_change))
+
+                    # Replacing the file also gives it its own inode, so any deduplicated copies are unaffected
+                    os.chmod(tmp_path, stat.S_IMODE(file_stat.st_mode))
+                    log.info('Overwriting file {}'.format(os_path))
+                    os.replace(tmp_path, os_path)
+            except FileNotFoundError:
+                return dict_to_response(error('Path %s doesn\'t exist' % web_path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if self.quota:
+            self.quota.add(self.get_root_path(), size_change)
+
+        item = self.get_file(web_path)
+        self.publish_change(os_path, 'modify', item)
+        return dict_to_response({'data': item})
+
+    def check_save_precondition(self, file_stat):
+        """
+        :return: False if the request says which version of the file it is replacing, and that isn't the
+                 current version
+        """
+        etag = get_etag(file_stat)
+
+        if request.if_match:
+            return request.if_match.contains(etag)
+
+        if request.form.get('etag'):
+            return request.form['etag'].strip('"') == etag
+
+        if request.form.get('mtime'):
+            try:
+                return int(float(request.form['mtime'])) == int(file_stat.st_mtime)
+            except ValueError:
+                return False
+
+        return True
+
+    def replace_file(self):
+        web_path = request.form.get('newfilepath')
+        if not web_path:
+            return error('No path in query')
+
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.exists(os_path):
+            return error('Path %s doesn\'t exist' % web_path)
+
+        if os.path.isdir(os_path):
+            return error('Path %s is not a valid file' % web_path)
+
+        # Get uploaded file
+        uploaded_file = next(iter(request.files.values()))
+
+        # Read the file into memory
+        data = uploaded_file.read()
+
+        if self.quota:
+            size_change = len(data) - os.path.getsize(os_path)
+            if not self.quota.has_space(self.get_root_path(), size_change):
+                return self.quota_error(size_change)
+
+        if self.dedup:
+            self.dedup.unshare(os_path)
+
+        with open(os_path, 'wb') as f:
+            f.write(data)
+
+        if self.quota:
+            self.quota.add(self.get_root_path(), size_change)
+
+        self.publish_change(os_path, 'modify')
+
+        path_parts = os.path.split(web_path)
+
+        return {
+            'Path': os.path.join(*path_parts[:-1]),
+            'Name': path_parts[-1],
+            'Error': '',
+            'Code': 0
+        }
 
-    return get_file(os.path.join(web_new_path, old_name))
+    def delete_file(self):
+        web_path = request.args.get('path')
+        if not web_path:
+            return error('No path in query')
 
+        if web_path == '/':
+            return error('Can\'t delete root')
 
-def add_folder():
-    web_path = request.args.get('path')
-    if not web_path:
-        return error('No path specified')
+        response = self.get_file(web_path)
 
-    name = request.args.get('name')
-    if not name:
-        return error('No name for new folder')
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.exists(os_path):
+            return error('File %s doesn\'t exist' % web_path)
 
-    os_path = web_path_to_os_path(web_path)
+        if self.quota:
+            size = get_tree_size(os_path)
 
-    if not os.path.exists(os_path):
-        return error('Path %s doesn\'t exist' % web_path)
+        if os.path.isdir(os_path):
+            try:
+                log.info('Deleting directory: {}'.format(os_path))
+                shutil.rmtree(os_path)
+            except Exception as e:
+                return error('Operation failed: %s' % e)
+        else:
+            try:
+                log.info('Deleting file: {}'.format(os_path))
+                os.remove(os_path)
+            except Exception as e:
+                return error('Operation failed: %s' % e)
 
-    if not os.path.isdir(os_path):
-        return error('Path %s is not a directory' % web_path)
+        if self.quota:
+            self.quota.add(self.get_root_path(), -size)
 
-    os_new_path = os.path.join(os_path, name)
-    if os.path.exists(os_new_path):
-        return error('File already exists')
+        self.publish_change(os_path, 'delete', response)
 
-    try:
-        os.mkdir(os_new_path)
-    except Exception as e:
-        return error('Operation failed: %s' % e)
+        return response
 
-    return get_file(os.path.join(web_path, name))
+    def extract_file(self):
+        web_source = request.form.get('source')
+        if not web_source:
+            return dict_to_response(error('No source specified'))
 
+        web_target = request.form.get('target')
+        if not web_target:
+            return dict_to_response(error('No target specified'))
 
-def upload_file():
-    # This is supposed to handle multiple files, but the frontend only ever seems to send 1...
-    web_path = request.form.get('path')
-    if not web_path:
-        return error('No path in query')
+        os_source = self.web_path_to_os_path(web_source)
+        if not is_archive(os_source):
+            return dict_to_response(error('%s is not a zip or tar archive' % web_source))
 
-    os_path = web_path_to_os_path(web_path)
-    if not os.path.exists(os_path):
-        return error('Path %s doesn\'t exist' % web_path)
+        os_target = self.web_path_to_os_path(web_target)
+        if not os.path.isdir(os_target):
+            return dict_to_response(error('Path %s is not a directory' % web_target))
 
-    if not os.path.isdir(os_path):
-        return error('Path %s is not a directory' % web_path)
+        root = self.get_root_path()
+        max_size = self.quota.get_remaining(root) if self.quota else None
+        job = self.extractor.start(os_source, os_target, max_size=max_size, root=root)
 
-    # Get uploaded file
-    uploaded_file = request.files['files']
-    filename = uploaded_file.filename
+        # Small archives will be finished quickly, so the frontend can show the new files straight away.
+        # Otherwise it will have to check the status of the job
+        job.wait(self.config.get('EXTRACT_WAIT', 10))
 
-    os_dest_path = os.path.join(os_path, filename)
-    if os.path.exists(os_dest_path):
-        return error('Upload failed: file %s already exists' % os_dest_path)
+        if job.status == 'failed':
+            return dict_to_response(error(job.error))
 
-    # Read the file into memory
-    data = uploaded_file.read()
-    
-    log.info('Uploading file to {}'.format(os_dest_path))
-    with open(os_dest_path, 'wb') as f:
-        f.write(data)
+        items = []
+        if job.done:
+            items = [self.get_file(os.path.join(web_target, name)) for name in job.items]
 
-    return [get_file(os.path.join(web_path, filename))]
+        return dict_to_response({
+            'data': items,
+            'meta': {
+                'job': job.to_dict()
+            }
+        })
 
+    def get_extract_status(self):
+        job_id = request.args.get('id')
+        if not job_id:
+            return error('No job id specified')
 
-def save_file():
-    # This is supposed to handle multiple files, but the frontend only ever seems to send 1...
-    web_path = request.form.get('path')
-    if not web_path:
-        return error('No path in query')
+        job = self.extractor.get_job(job_id)
+        if job is None or job.root != self.get_root_path():
+            return error('Unknown extract job %s' % job_id)
 
-    os_path = web_path_to_os_path(web_path)
-    if not os.path.exists(os_path):
-        return error('Path %s doesn\'t exist' % web_path)
+        return job.to_dict()
 
-    if os.path.isdir(os_path):
-        return error('Path %s is a directory' % web_path)
+    def on_extract_complete(self, job):
+        if self.quota:
+            self.quota.add(job.root, job.bytes_written)
 
-    content = request.form.get('content')
-    if content is None:
-        return error('No content')
+        # This is called from the extract thread, so subscribers have to load the items themselves
+        for name in job.items:
+            self.publish_change(os.path.join(job.target, name), 'create')
 
-    log.info('Overwriting file {}'.format(os_path))
-    with open(os_path, 'w') as f:
-        f.write(content)
+    def download_file(self):
+        web_path = request.args.get('path')
+        if not web_path:
+            abort(400)
 
-    return get_file(web_path)
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.exists(os_path):
+            abort(404)
+    
+        if os.path.isdir(os_path):
+            return 'TODO: download directory as zip'
 
+        return send_from_directory(self.get_root_path(), web_path_to_local(web_path), as_attachment=True)
 
-def replace_file():
-    web_path = request.form.get('newfilepath')
-    if not web_path:
-        return error('No path in query')
+    def get_image(self):
+        web_path = request.args.get('path')
+        if not web_path:
+            return error('No path in request')
 
-    os_path = web_path_to_os_path(web_path)
-    if not os.path.exists(os_path):
-        return error('Path %s doesn\'t exist' % web_path)
+        thumbnail = request.args.get('thumbnail') == 'true'
 
-    if os.path.isdir(os_path):
-        return error('Path %s is not a valid file' % web_path)
+        os_path = self.web_path_to_os_path(web_path)
+        if not os.path.exists(os_path):
+            abort(404)
 
-    # Get uploaded file
-    uploaded_file = next(iter(request.files.values()))
+        if os.path.isdir(os_path):
+            return error('Requested image is actually a directory!')
 
-    # Read the file into memory
-    data = uploaded_file.read()
+        if thumbnail:
+            return self.get_thumbnail_response(os_path)
 
-    with open(os_path, 'wb') as f:
-        f.write(data)
+        if request.args.get('width') or request.args.get('height'):
+            return self.get_image_variant(os_path)
 
-    path_parts = os.path.split(web_path)
+        return send_from_directory(self.get_root_path(), web_path_to_local(web_path), as_attachment=True)
 
-    return {
-        'Path': os.path.join(*path_parts[:-1]),
-        'Name': path_parts[-1],
-        'Error': '',
-        'Code': 0
-    }
+    def get_image_variant(self, os_path):
+        """
+        Resize the image to the width and/or height in the request, in the best format the client accepts
+        """
+        max_size = self.config.get('VARIANT_MAX_SIZE', 2048)
+        try:
+            width, height = [min(max(1, int(request.args[k])), max_size) if request.args.get(k) else None
+                             for k in ('width', 'height')]
+        except ValueError:
+            return dict_to_response(error('Invalid image size'))
 
+        fit = request.args.get('fit', 'contain')
+        if fit not in FITS:
+            return dict_to_response(error('Invalid fit: %s' % fit))
 
-def delete_file():
-    web_path = request.args.get('path')
-    if not web_path:
-        return error('No path in query')
+        try:
+            with PIL.Image.open(os_path) as image:
+                has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        except OSError:
+            return dict_to_response(error('Requested file is not an image'))
 
-    if web_path == '/':
-        return error('Can\'t delete root')
+        output_format = negotiate_format(request.headers.get('Accept'), has_alpha)
+        mime_type = output_format[1]
 
-    response = get_file(web_path)
+        if self.variant_cache:
+            response = send_file(self.variant_cache.get(os_path, width, height, fit, output_format),
+                                 mimetype=mime_type, conditional=True)
+        else:
+            response = make_response(render_variant(os_path, width, height, fit, output_format))
+            response.headers['Content-Type'] = mime_type
 
-    os_path = web_path_to_os_path(web_path)
-    if not os.path.exists(os_path):
-        return error('File %s doesn\'t exist' % web_path)
+        response.vary.add('Accept')
+        return response
 
-    if os.path.isdir(os_path):
-        try:
-            log.info('Deleting directory: {}'.format(os_path))
-            shutil.rmtree(os_path)
-        except Exception as e:
-            return error('Operation failed: %s' % e)
-    else:
-        try:
-            log.info('Deleting file: {}'.format(os_path))
-            os.remove(os_path)
-        except Exception as e:
-            return error('Operation failed: %s' % e)
+    def get_thumbnail_response(self, os_path):
+        image = PIL.Image.open(os_path)
+        thumbnail_image = imageutil.resize_pad_image(image, 64, 64)
+        thumbnail_io = io.BytesIO()
+        thumbnail_image.save(thumbnail_io, format='PNG')
+        thumbnail_data = thumbnail_io.getvalue()
 
-    return response
+        response = make_response(thumbnail_data)
+        response.headers['Content-Type'] = 'image/png'
+        response.headers['Content-Disposition'] = 'attachment; filename=thumbnail.png'
+        return response
 
 
-def download_file():
-    web_path = request.args.get('path')
-    if not web_path:
-        abort(400)
+# The default instance, used by init() and the module level functions
+_default_filemanager = FileManager()
+filemanager_blueprint = _default_filemanager.blueprint
 
-    os_path = web_path_to_os_path(web_path)
-    if not os.path.exists(os_path):
-        abort(404)
-    
-    if os.path.isdir(os_path):
-        return 'TODO: download directory as zip'
 
-    return send_from_directory(_FILE_PATH, web_path_to_local(web_path), as_attachment=True)
+def set_access_control_function(fun):
+    _default_filemanager.access_control_function = fun
 
 
-def get_image():
-    web_path = request.args.get('path')
-    if not web_path:
-        return error('No path in request')
+def set_custom_config_json_path(filename):
+    _default_filemanager.custom_config_json_path = filename
 
-    thumbnail = request.args.get('thumbnail') == 'true'
 
-    os_path = web_path_to_os_path(web_path)
-    if not os.path.exists(os_path):
-        abort(404)
+def set_custom_init_js_path(filename):
+    _default_filemanager.custom_init_js_path = filename
 
-    if os.path.isdir(os_path):
-        return error('Requested image is actually a directory!')
 
-    if thumbnail:
-        image = PIL.Image.open(os_path)
-        thumbnail_image = imageutil.resize_pad_image(image, 64, 64)
-        thumbnail_io = io.BytesIO()
-        thumbnail_image.save(thumbnail_io, format='PNG')
-        thumbnail_data = thumbnail_io.getvalue()
+def init(app, register_blueprint=True, url_prefix='/fm', access_control_function=None,
+         custom_config_json_path=None, custom_init_js_path=None):
+    """
+    Initialise the default filemanager.  To add more than one filemanager to an app, create FileManager
+    instances instead.
 
-        response = make_response(thumbnail_data)
-        response.headers['Content-Type'] = 'image/png'
-        response.headers['Content-Disposition'] = 'attachment; filename=thumbnail.png'
-        return response
+    :param app: The Flask app
+    :param register_blueprint: Override to False to stop the blueprint from automatically being registered to the
+                               app
+    :param url_prefix: The URL prefix for the blueprint, defaults to /fm
+    :param access_control_function: Pass in a function here to implement access control.  The function will
+                                    be called any time someone tries to access the filemanager, and a 404
+                                    will be returned if this function returns False
+    :param custom_config_json_path: Set this to the full path of you filemanager.config.json file if you want
+                                    to use a custom config. Example:
+                                    os.path.join(app.root_path, 'static/filemanager.config.json')
+    :param custom_init_js_path: Set this to the full path of you filemanager.init.js file if you want
+                                to use a custom init.js. Example:
+                                os.path.join(app.root_path, 'static/filemanager.init.js')
+    """
+    if access_control_function:
+        set_access_control_function(access_control_function)
+
+    if custom_config_json_path:
+        set_custom_config_json_path(custom_config_json_path)
+
+    if custom_init_js_path:
+        set_custom_init_js_path(custom_init_js_path)
 
-    return send_from_directory(_FILE_PATH, web_path_to_local(web_path), as_attachment=True)
+    _default_filemanager.url_prefix = url_prefix
+    _default_filemanager.init_app(app, register_blueprint=register_blueprint)
 
 
+def get_root_path():
+    return _default_filemanager.get_root_path()
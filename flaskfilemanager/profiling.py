@@ -0,0 +1,114 @@
+"""
+On-demand profiling of connector requests.
+
+Profiling is enabled by setting FLASKFILEMANAGER_PROFILE_DIR.  A request is then profiled if either:
+
+ * It carries the X-Filemanager-Profile header, or a "profile" query parameter, whose value matches
+   FLASKFILEMANAGER_PROFILE_KEY
+ * It is picked at random according to FLASKFILEMANAGER_PROFILE_SAMPLE_RATE (0.0 - 1.0)
+
+Each profiled request writes a cProfile dump to the profile directory.  These can be inspected with pstats,
+snakeviz, or turned into a flamegraph with flameprof / gprof2dot.
+"""
+
+import logging
+import cProfile
+import datetime
+import hmac
+import os
+import random
+import re
+import threading
+
+from flask import request
+from littlefish import util
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Filemanager-Profile'
+PROFILE_PARAM = 'profile'
+# Modes that can go in a profile's filename as they are.  Anything else comes from the client, so isn't trusted
+MODE_RE = re.compile(r'[a-z]+')
+
+
+class ConnectorProfiler(object):
+    def __init__(self, output_dir, sample_rate=0.0, trigger_key=None):
+        """
+        :param output_dir: Directory that profile dumps are written to
+        :param sample_rate: Fraction of requests (0.0 - 1.0) to profile regardless of the trigger
+        :param trigger_key: Secret value that must be sent in the header or parameter to force profiling of
+                            a request.  If this is None, requests can only be profiled by sampling
+        """
+        self.output_dir = output_dir
+        self.sample_rate = float(sample_rate or 0.0)
+        self.trigger_key = trigger_key
+
+        if not 0.0 <= self.sample_rate <= 1.0:
+            raise ValueError('Profile sample rate must be between 0.0 and 1.0, got {}'.format(sample_rate))
+
+        # cProfile can only have one active profiler per thread, and profiling other threads at the same
+        # time skews the results, so we only profile one request at a time
+        self._lock = threading.Lock()
+
+        util.ensure_dir(self.output_dir)
+
+    def is_triggered(self):
+        """
+        :return: True if the current request has asked to be profiled with the correct key
+        """
+        if not self.trigger_key:
+            return False
+
+        value = request.headers.get(PROFILE_HEADER)
+        if value is None:
+            value = request.args.get(PROFILE_PARAM)
+
+        if value is None:
+            return False
+
+        return hmac.compare_digest(value.encode(), self.trigger_key.encode())
+
+    def should_profile(self):
+        if self.is_triggered():
+            return True
+
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def get_output_path(self, mode):
+        if not mode:
+            mode = 'none'
+        elif not MODE_RE.fullmatch(mode):
+            mode = 'unknown'
+
+        timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        filename = '{}-{}-{}-{}.prof'.format(timestamp, request.method.lower(), mode, os.getpid())
+        return os.path.join(self.output_dir, filename)
+
+    def profile(self, mode, fun, *args, **kwargs):
+        """
+        Call fun, profiling it if this request should be profiled
+        """
+        if not self.should_profile():
+            return fun(*args, **kwargs)
+
+        if not self._lock.acquire(blocking=False):
+            log.debug('Skipping profile of {} - another request is being profiled'.format(mode))
+            return fun(*args, **kwargs)
+
+        try:
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(fun, *args, **kwargs)
+            finally:
+                output_path = self.get_output_path(mode)
+                try:
+                    profiler.dump_stats(output_path)
+                    log.info('Wrote connector profile to {}'.format(output_path))
+                except OSError:
+                    log.exception('Failed to write connector profile to {}'.format(output_path))
+        finally:
+            self._lock.release()
+
@@ -0,0 +1,235 @@
+"""
+Incremental storage quota accounting.
+
+The usage of each root directory is kept in memory and updated by the connector every time it writes or
+deletes something, so checking the quota never requires walking the tree.  Usage is persisted to a JSON state
+file so that it survives restarts.  Several processes (i.e. gunicorn workers) can share one state file - each
+process only writes its own changes since the last flush, under a file lock, and then picks up everyone
+else's.
+
+Counters can drift (files changed outside of the filemanager, crashes between writing a file and flushing
+the counters, processes flushing changes that a reconciliation already counted), so a background thread
+periodically walks each root and replaces the counter with the real value.
+"""
+
+import logging
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+
+def get_tree_size(path):
+    """
+    :return: The total size in bytes of the file at path, or all files under path if it is a directory.
+             Symlinks are not followed
+    """
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size
+
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except FileNotFoundError:
+                        # Deleted while we were walking
+                        pass
+        except FileNotFoundError:
+            pass
+
+    return total
+
+
+class QuotaManager(object):
+    def __init__(self, limit, state_path, flush_interval=5, reconcile_interval=3600):
+        """
+        :param limit: Maximum number of bytes allowed in each root
+        :param state_path: JSON file that usage is persisted to
+        :param flush_interval: How often (in seconds) changes are written to the state file
+        :param reconcile_interval: How often (in seconds) each root is walked to correct the usage counter
+        """
+        self.limit = limit
+        self.state_path = state_path
+        self.lock_path = state_path + '.lock'
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+
+        self._lock = threading.Lock()
+        # Current usage as far as this process knows, by root
+        self._usage = {}
+        # Changes made by this process that haven't been written to the state file yet
+        self._pending = {}
+        # Roots that have been walked and need their absolute value written to the state file
+        self._reconciled = {}
+        self._last_reconcile = time.time()
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        state_dir = os.path.dirname(os.path.abspath(state_path))
+        if not os.path.isdir(state_dir):
+            os.makedirs(state_dir)
+
+        with self._lock:
+            self._usage.update(self._read_state())
+
+    def start(self):
+        """
+        Start the background thread that flushes and reconciles the counters
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name='flaskfilemanager-quota', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+
+                if time.time() - self._last_reconcile >= self.reconcile_interval:
+                    self.reconcile()
+            except Exception:
+                log.exception('Error updating quota state')
+
+    def _read_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            log.exception('Quota state file {} is corrupt - usage will be recalculated'.format(self.state_path))
+            return {}
+
+    def _write_state(self, state):
+        tmp_path = '{}.{}.tmp'.format(self.state_path, os.getpid())
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def flush(self):
+        """
+        Write this process' changes to the state file, and load changes made by other processes
+        """
+        with self._lock:
+            pending = self._pending
+            reconciled = self._reconciled
+            self._pending = {}
+            self._reconciled = {}
+
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = self._read_state()
+                for root, usage in reconciled.items():
+                    state[root] = usage
+
+                for root, delta in pending.items():
+                    state[root] = max(0, state.get(root, 0) + delta)
+
+                if pending or reconciled:
+                    self._write_state(state)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        with self._lock:
+            for root, usage in state.items():
+                self._usage[root] = usage + self._pending.get(root, 0)
+
+    def reconcile(self, roots=None):
+        """
+        Walk roots (defaults to all known roots) and set their usage to the real value
+        """
+        self._last_reconcile = time.time()
+
+        # Get our pending changes out of the way first, so that they aren't counted twice
+        self.flush()
+
+        with self._lock:
+            roots = list(self._usage.keys()) if roots is None else roots
+
+        for root in roots:
+            if not os.path.isdir(root):
+                continue
+
+            usage = get_tree_size(root)
+
+            with self._lock:
+                old_usage = self._usage.get(root)
+                self._usage[root] = usage
+                self._reconciled[root] = usage
+                self._pending.pop(root, None)
+
+            if old_usage != usage:
+                log.info('Quota usage for {} reconciled from {} to {} bytes'.format(root, old_usage, usage))
+
+    def get_usage(self, root):
+        root = os.path.abspath(root)
+
+        with self._lock:
+            if root in self._usage:
+                return self._usage[root]
+
+        # First time we've seen this root, so we have no choice but to walk it
+        log.info('Calculating initial quota usage for {}'.format(root))
+        usage = get_tree_size(root)
+
+        with self._lock:
+            self._usage.setdefault(root, usage)
+            self._reconciled.setdefault(root, usage)
+            return self._usage[root]
+
+    def get_remaining(self, root):
+        return max(0, self.limit - self.get_usage(root))
+
+    def has_space(self, root, size):
+        """
+        :return: True if size more bytes can be written to root without exceeding the quota
+        """
+        return size <= 0 or self.get_usage(root) + size <= self.limit
+
+    def add(self, root, delta):
+        """
+        Record that delta bytes have been added to (or removed from, if negative) root
+        """
+        if not delta:
+            return
+
+        root = os.path.abspath(root)
+
+        with self._lock:
+            known = root in self._usage
+
+        if not known:
+            # The change has already been made, so walking the root counts it
+            self.get_usage(root)
+            return
+
+        with self._lock:
+            self._usage[root] = max(0, self._usage[root] + delta)
+            self._pending[root] = self._pending.get(root, 0) + delta
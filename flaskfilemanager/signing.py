@@ -0,0 +1,86 @@
+"""
+HMAC signed, expiring URLs for user files and thumbnails.
+
+A signed URL can be checked without calling the access control function (which is often a session or
+database lookup), so they are cheap to serve and the responses can be cached by shared proxies or CDNs.  The
+signature is in the path rather than the query string, as some CDNs ignore query strings, and the frontend
+adds its own cache busting parameters to some URLs.
+
+Expiry times are rounded up, so the same URL is generated for a file for a while.  Otherwise every listing
+would generate new URLs, and nothing could ever be served from a cache.
+"""
+
+import logging
+import base64
+import hashlib
+import hmac
+import time
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class UrlSigner(object):
+    def __init__(self, key, expiry=3600):
+        """
+        :param key: Secret key used to sign URLs
+        :param expiry: Minimum time (in seconds) that a generated URL is valid for
+        """
+        if isinstance(key, str):
+            key = key.encode()
+
+        self.key = key
+        self.expiry = expiry
+        # URLs stay the same for a quarter of the expiry time, and are valid for up to 1.25 times it
+        self.granularity = max(1, expiry // 4)
+
+    def _get_signature(self, kind, root, path, expires, version):
+        message = '\n'.join([kind, root or '', path, str(expires), version]).encode()
+        return _b64encode(hmac.new(self.key, message, hashlib.sha256).digest())
+
+    def get_token(self, kind, path, root=None, version=None):
+        """
+        :param kind: What the URL is for, i.e. 'userfile' or 'thumbnail', so that a signature for one can't be
+                     used for the other
+        :param path: The web path of the file
+        :param root: The root directory, if it can't be determined without the request (i.e. when using a root
+                     resolver).  This is included in the token
+        :param version: Optional version of the file, i.e. its modification time and size.  This changes the URL when
+                        the file changes, so that caches don't serve old versions
+        :return: Token to include in the URL
+        """
+        expires = -(-(int(time.time()) + self.expiry) // self.granularity) * self.granularity
+        version = str(version) if version is not None else ''
+        encoded_root = _b64encode(root.encode()) if root else ''
+        signature = self._get_signature(kind, root, path, expires, version)
+        return '{}.{}.{}.{}'.format(expires, version, encoded_root, signature)
+
+    def verify_token(self, token, kind, path):
+        """
+        :return: Tuple of (root, expires) if the token is valid for the path, otherwise None.  The root is
+                 None if the token doesn't include one
+        """
+        try:
+            expires, version, encoded_root, signature = token.split('.')
+            expires = int(expires)
+            root = _b64decode(encoded_root).decode() if encoded_root else None
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+        if expires < time.time():
+            return None
+
+        if not hmac.compare_digest(signature, self._get_signature(kind, root, path, expires, version)):
+            return None
+
+        return root, expires
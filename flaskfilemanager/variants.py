@@ -0,0 +1,238 @@
+"""
+Resized variants of images, for previews.
+
+Variants are rendered at the size they will be displayed at, in the best format the browser accepts (AVIF or
+WebP, if Pillow can write them), so that previews don't have to download and decode the original.  JPEGs are
+decoded at a reduced scale where possible, so rendering a small variant of a large photo is cheap as well.
+
+Rendered variants are cached on disk.  The cache key includes the source file's modification time and size,
+so editing or replacing an image never serves a stale variant - the old ones just stop being used, and are
+evicted when the cache is full.  Eviction is least recently used: the modification time of a cached file is
+updated when it is served, and the oldest files are removed first.
+"""
+
+import logging
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import PIL.Image
+import PIL.ImageOps
+from littlefish import imageutil
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+FITS = ['contain', 'cover', 'pad']
+# Output formats, best first, as (Pillow format, mime type, save options)
+OUTPUT_FORMATS = [
+    ('AVIF', 'image/avif', {'quality': 60}),
+    ('WEBP', 'image/webp', {'quality': 80}),
+]
+FALLBACK_FORMATS = {
+    'JPEG': ('JPEG', 'image/jpeg', {'quality': 85, 'optimize': True}),
+    'PNG': ('PNG', 'image/png', {'optimize': True})
+}
+# Cached files are only touched when served if they haven't been for this long (in seconds), to save writes
+TOUCH_INTERVAL = 60
+# When the cache is full, evict until it is this fraction of the maximum size
+EVICT_TO = 0.9
+# EXIF tag for the orientation of the image
+EXIF_ORIENTATION = 0x0112
+
+
+def get_writable_formats():
+    PIL.Image.init()
+    return [f for f in OUTPUT_FORMATS if f[0] in PIL.Image.SAVE]
+
+
+def parse_accept(accept):
+    """
+    :return: Set of mime types in an Accept header that aren't explicitly refused with q=0
+    """
+    mime_types = set()
+    for part in (accept or '').split(','):
+        params = [p.strip() for p in part.split(';')]
+        refused = any(p.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000') for p in params[1:])
+        if params[0] and not refused:
+            mime_types.add(params[0].lower())
+
+    return mime_types
+
+
+def negotiate_format(accept, has_alpha):
+    """
+    :param accept: The request's Accept header
+    :param has_alpha: Whether the image has transparency, in which case PNG is used instead of JPEG if neither
+                      AVIF or WebP are accepted
+    :return: Tuple of (Pillow format, mime type, save options)
+    """
+    mime_types = parse_accept(accept)
+    for output_format in get_writable_formats():
+        if output_format[1] in mime_types:
+            return output_format
+
+    return FALLBACK_FORMATS['PNG' if has_alpha else 'JPEG']
+
+
+def render_variant(os_path, width, height, fit, output_format):
+    """
+    :param width: Target width, or None to scale to the height
+    :param height: Target height, or None to scale to the width
+    :param fit: How to fit the image into the target box if both dimensions are given: 'contain' scales it down
+                to fit inside, 'cover' scales and crops it to fill the box and 'pad' scales it to fit inside and
+                pads it to the size of the box
+    :param output_format: Tuple from negotiate_format()
+    :return: The encoded image data
+    """
+    image = PIL.Image.open(os_path)
+
+    # The target size is for the image as displayed, which has its axes swapped if the EXIF orientation rotates
+    # it by 90 degrees
+    rotated = image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8)
+    src_w, src_h = reversed(image.size) if rotated else image.size
+
+    # Let the JPEG decoder do most of the scaling, which is far cheaper than decoding at full size
+    if width and height and fit == 'contain':
+        scale = min(width / src_w, height / src_h)
+    else:
+        scale = max((width or 0) / src_w, (height or 0) / src_h)
+    draft_size = (max(1, int(src_w * scale)), max(1, int(src_h * scale)))
+    image.draft('RGB', tuple(reversed(draft_size)) if rotated else draft_size)
+
+    image = PIL.ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    src_w, src_h = image.size
+    if width and height and fit == 'cover':
+        image = imageutil.resize_crop_image(image, width, height)
+    elif width and height and fit == 'pad':
+        image = imageutil.resize_pad_image(image, width, height)
+    else:
+        # Never scale images up to fit.  Rounded rather than truncated, so that the requested width or height is
+        # hit exactly
+        scale = min(width / src_w if width else 1, height / src_h if height else 1)
+        if scale < 1:
+            image = image.resize((max(1, round(src_w * scale)), max(1, round(src_h * scale))), PIL.Image.LANCZOS)
+
+    pil_format, mime_type, options = output_format
+    if pil_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    image_io = io.BytesIO()
+    image.save(image_io, format=pil_format, **options)
+    return image_io.getvalue()
+
+
+class VariantCache(object):
+    def __init__(self, cache_dir, max_bytes):
+        """
+        :param cache_dir: Directory to store rendered variants in
+        :param max_bytes: Maximum total size of the cache
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # Our estimate of the size of the cache, corrected every time we evict.  None until first needed
+        self._size = None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_path(self, os_path, width, height, fit, output_format):
+        """
+        :return: The path that the variant is cached at, whether or not it exists yet
+        """
+        source_stat = os.stat(os_path)
+        key = '\n'.join(str(k) for k in [os.path.realpath(os_path), source_stat.st_mtime_ns, source_stat.st_size,
+                                          width, height, fit, output_format[0]])
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], '{}.{}'.format(digest, output_format[0].lower()))
+
+    def get(self, os_path, width, height, fit, output_format):
+        """
+        :return: The path of the cached variant, rendering and caching it first if necessary
+        """
+        cache_path = self.get_path(os_path, width, height, fit, output_format)
+
+        try:
+            if time.time() - os.stat(cache_path).st_mtime > TOUCH_INTERVAL:
+                os.utime(cache_path)
+            return cache_path
+        except FileNotFoundError:
+            # Not cached yet, or evicted by another process
+            pass
+
+        data = render_variant(os_path, width, height, fit, output_format)
+        self._store(cache_path, data)
+        return cache_path
+
+    def _store(self, cache_path, data):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self.get_size()
+            else:
+                self._size += len(data)
+
+            if self._size > self.max_bytes:
+                self._evict(keep=cache_path)
+
+    def _iter_files(self):
+        for dir_path, dir_names, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.startswith('.tmp-'):
+                    # Still being written
+                    continue
+
+                path = os.path.join(dir_path, filename)
+                try:
+                    yield path, os.stat(path)
+                except FileNotFoundError:
+                    pass
+
+    def get_size(self):
+        return sum(file_stat.st_size for path, file_stat in self._iter_files())
+
+    def _evict(self, keep=None):
+        """
+        :param keep: Path of a file not to evict, i.e. the one that we're about to serve
+        """
+        files = sorted(self._iter_files(), key=lambda f: f[1].st_mtime)
+        size = sum(file_stat.st_size for path, file_stat in files)
+        target = self.max_bytes * EVICT_TO
+        removed = 0
+
+        for path, file_stat in files:
+            if size <= target:
+                break
+
+            if path == keep:
+                continue
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            size -= file_stat.st_size
+            removed += 1
+
+        log.info('Evicted {} image variants, cache is now {} bytes'.format(removed, size))
+        self._size = size
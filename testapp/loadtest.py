@@ -0,0 +1,356 @@
+"""
+Load test for the filemanager connector.
+
+Replays the request mix that the RichFilemanager frontend generates against a running test app, using a
+number of concurrent simulated users.  Each user repeatedly runs a session that looks like this:
+
+ * initiate
+ * getfolder storm - the filetree loads the root folder and then each of its sub folders
+ * thumbnail burst - the grid view requests a thumbnail for every image in the folder
+ * upload a file (which is then deleted again)
+ * download a file
+
+Latency percentiles and throughput are reported per mode.
+
+To start the test app under gunicorn and run the test against it:
+
+    python loadtest.py --spawn --concurrency 16 --duration 60
+
+Or to run against an app that is already running:
+
+    python loadtest.py --url http://127.0.0.1:8080/fm/connectors/py/filemanager.py
+"""
+
+import argparse
+import collections
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+
+import PIL.Image
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+log = logging.getLogger(__name__)
+
+TESTAPP_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_FOLDER = '/loadtest/'
+UPLOAD_FOLDER = ROOT_FOLDER + 'uploads/'
+DOWNLOAD_FILE = ROOT_FOLDER + 'download.bin'
+
+
+class ConnectorError(Exception):
+    pass
+
+
+class Client(object):
+    """
+    Minimal keep-alive HTTP client for the connector.  One of these is used per simulated user
+    """
+    def __init__(self, url):
+        parts = urllib.parse.urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path
+        self.connection = None
+
+    def _connect(self):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def request(self, method, params=None, body=None, headers=None):
+        url = self.path
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+
+        connection = self._connect()
+        try:
+            connection.request(method, url, body=body, headers=headers or {})
+            response = connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self.close()
+            raise
+
+        if response.status != 200:
+            raise ConnectorError('{} {} returned {}'.format(method, url, response.status))
+
+        if response.getheader('Content-Type', '').startswith('application/json'):
+            data = json.loads(data.decode())
+            if 'errors' in data:
+                raise ConnectorError('{} {} returned error: {}'.format(method, url, data['errors']))
+            return data.get('data')
+
+        return data
+
+    def get(self, mode, **params):
+        params['mode'] = mode
+        return self.request('GET', params=params)
+
+    def upload(self, web_path, filename, data):
+        boundary = uuid.uuid4().hex
+        body = io.BytesIO()
+        for name, value in (('mode', 'upload'), ('path', web_path)):
+            body.write('--{}\r\nContent-Disposition: form-data; name="{}"\r\n\r\n{}\r\n'
+                       .format(boundary, name, value).encode())
+
+        body.write('--{}\r\nContent-Disposition: form-data; name="files"; filename="{}"\r\n'
+                   'Content-Type: application/octet-stream\r\n\r\n'.format(boundary, filename).encode())
+        body.write(data)
+        body.write('\r\n--{}--\r\n'.format(boundary).encode())
+
+        return self.request('POST', body=body.getvalue(), headers={
+            'Content-Type': 'multipart/form-data; boundary={}'.format(boundary)
+        })
+
+
+class Stats(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def record(self, mode, fun, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fun(*args, **kwargs)
+        except (ConnectorError, http.client.HTTPException, OSError) as e:
+            with self.lock:
+                self.errors[mode] += 1
+            log.debug('{} failed: {}'.format(mode, e))
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.latencies[mode].append(elapsed)
+
+    def report(self, duration):
+        results = collections.OrderedDict()
+        for mode in sorted(self.latencies):
+            timings = sorted(self.latencies[mode])
+            results[mode] = {
+                'count': len(timings),
+                'errors': self.errors[mode],
+                'per_second': len(timings) / duration,
+                'p50_ms': percentile(timings, 50) * 1000,
+                'p95_ms': percentile(timings, 95) * 1000,
+                'p99_ms': percentile(timings, 99) * 1000
+            }
+
+        total = sum(len(t) for t in self.latencies.values())
+        results['total'] = {
+            'count': total,
+            'errors': sum(self.errors.values()),
+            'per_second': total / duration
+        }
+
+        return results
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+
+    index = int(round(percent / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def create_image_data(width, height):
+    image = PIL.Image.effect_noise((width, height), 64).convert('RGB')
+    image_io = io.BytesIO()
+    image.save(image_io, format='JPEG', quality=85)
+    return image_io.getvalue()
+
+
+def seed(client, num_folders, images_per_folder, download_size):
+    """
+    Create the folders, images and download file that the sessions use
+    """
+    log.info('Seeding test data under {}'.format(ROOT_FOLDER))
+
+    folder_name = ROOT_FOLDER.strip('/')
+    existing = client.get('getfolder', path='/')
+    if '/' + folder_name not in existing:
+        client.get('addfolder', path='/', name=folder_name)
+
+    existing = client.get('getfolder', path=ROOT_FOLDER)
+    if existing:
+        log.info('Test data already exists - delete {} to regenerate it'.format(ROOT_FOLDER))
+        return
+
+    image_data = create_image_data(1600, 1200)
+    client.get('addfolder', path=ROOT_FOLDER, name='uploads')
+    client.upload(ROOT_FOLDER, 'download.bin', os.urandom(download_size))
+
+    for i in range(num_folders):
+        name = 'folder-{:03d}'.format(i)
+        client.get('addfolder', path=ROOT_FOLDER, name=name)
+        for j in range(images_per_folder):
+            client.upload(ROOT_FOLDER + name + '/', 'image-{:03d}.jpg'.format(j), image_data)
+
+
+def run_session(client, stats, rand, upload_size):
+    stats.record('initiate', client.get, 'initiate')
+
+    # The filetree loads the root and then expands folders
+    listing = stats.record('getfolder', client.get, 'getfolder', path=ROOT_FOLDER)
+    if not listing:
+        return
+
+    folders = [item['id'] for item in listing.values() if item['type'] == 'folder'
+               and item['id'] != UPLOAD_FOLDER]
+    for folder in folders:
+        stats.record('getfolder', client.get, 'getfolder', path=folder)
+
+    # The user opens one folder in grid view, which loads a thumbnail for every image
+    if folders:
+        folder = rand.choice(folders)
+        contents = stats.record('getfolder', client.get, 'getfolder', path=folder)
+        for item in (contents or {}).values():
+            if item['type'] == 'file':
+                stats.record('getimage', client.get, 'getimage', path=item['id'], thumbnail='true')
+
+    filename = 'upload-{}.bin'.format(uuid.uuid4().hex)
+    if stats.record('upload', client.upload, UPLOAD_FOLDER, filename, os.urandom(upload_size)) is not None:
+        stats.record('delete', client.get, 'delete', path=UPLOAD_FOLDER + filename)
+
+    stats.record('download', client.get, 'download', path=DOWNLOAD_FILE)
+
+
+def worker(url, stats, deadline, worker_id, upload_size):
+    client = Client(url)
+    rand = random.Random(worker_id)
+
+    try:
+        while time.time() < deadline:
+            run_session(client, stats, rand, upload_size)
+    finally:
+        client.close()
+
+
+def spawn_gunicorn(bind, workers, threads, log_path):
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--bind', bind,
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--worker-class', 'gthread',
+        'wsgi:application'
+    ]
+
+    log.info('Starting gunicorn: {}'.format(' '.join(command)))
+    log_file = open(log_path, 'w')
+    return subprocess.Popen(command, cwd=TESTAPP_DIR, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_for_server(url, timeout=30):
+    client = Client(url)
+    deadline = time.time() + timeout
+
+    while True:
+        try:
+            client.get('initiate')
+            return
+        except (ConnectorError, http.client.HTTPException, OSError):
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+        finally:
+            client.close()
+
+
+def print_report(results):
+    print()
+    print('{:<12} {:>8} {:>7} {:>10} {:>10} {:>10} {:>10}'.format('mode', 'count', 'errors', 'req/s',
+                                                                 'p50 ms', 'p95 ms', 'p99 ms'))
+    for mode, result in results.items():
+        if mode == 'total':
+            continue
+
+        print('{:<12} {count:>8} {errors:>7} {per_second:>10.1f} {p50_ms:>10.1f} {p95_ms:>10.1f} '
+              '{p99_ms:>10.1f}'.format(mode, **result))
+
+    total = results['total']
+    print('{:<12} {count:>8} {errors:>7} {per_second:>10.1f}'.format('total', **total))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8080/fm/connectors/py/filemanager.py',
+                        help='URL of the connector')
+    parser.add_argument('--spawn', action='store_true', help='Start the test app under gunicorn first')
+    parser.add_argument('--gunicorn-workers', type=int, default=1)
+    parser.add_argument('--gunicorn-threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='Length of the test in seconds')
+    parser.add_argument('--folders', type=int, default=10, help='Number of folders to seed')
+    parser.add_argument('--images', type=int, default=20, help='Number of images to seed in each folder')
+    parser.add_argument('--upload-size', type=int, default=512 * 1024, help='Size of uploaded files in bytes')
+    parser.add_argument('--download-size', type=int, default=8 * 1024 * 1024,
+                        help='Size of the downloaded file in bytes')
+    parser.add_argument('--output', help='Write results to this JSON file as well')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    server = None
+    if args.spawn:
+        parts = urllib.parse.urlsplit(args.url)
+        bind = '{}:{}'.format(parts.hostname, parts.port or 80)
+        server = spawn_gunicorn(bind, args.gunicorn_workers, args.gunicorn_threads,
+                                os.path.join(TESTAPP_DIR, 'loadtest-server.log'))
+
+    try:
+        wait_for_server(args.url)
+        seed(Client(args.url), args.folders, args.images, args.download_size)
+
+        log.info('Running {} users for {} seconds'.format(args.concurrency, args.duration))
+        stats = Stats()
+        start = time.time()
+        deadline = start + args.duration
+
+        threads = [
+            threading.Thread(target=worker, args=(args.url, stats, deadline, i, args.upload_size))
+            for i in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Sessions in progress at the deadline are allowed to finish
+        results = stats.report(time.time() - start)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'concurrency': args.concurrency,
+                'duration': args.duration,
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Tests for flaskfilemanager.dedup
+"""
+
+import io
+import os
+import stat
+
+from flaskfilemanager import dedup
+from flaskfilemanager.dedup import DedupStore
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+def get_mode(path):
+    return stat.S_IMODE(os.stat(str(path)).st_mode)
+
+
+def test_stored_files_have_normal_permissions(tmp_path):
+    store = DedupStore(str(tmp_path / 'store'))
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+
+    store.store_stream(io.BytesIO(b'hello'), str(tree / 'a.txt'))
+    with open(str(tree / 'normal.txt'), 'w') as f:
+        f.write('hello')
+
+    assert get_mode(tree / 'a.txt') == 0o666 & ~dedup._UMASK
+    assert get_mode(tree / 'a.txt') == get_mode(tree / 'normal.txt')
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = DedupStore(str(tmp_path / 'store'))
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+
+    store.store_stream(io.BytesIO(b'same'), str(tree / 'a.txt'))
+    store.store_stream(io.BytesIO(b'same'), str(tree / 'b.txt'))
+    store.copy(str(tree / 'a.txt'), str(tree / 'c.txt'))
+
+    assert os.stat(str(tree / 'a.txt')).st_ino == os.stat(str(tree / 'c.txt')).st_ino
+    stats = store.get_stats()
+    assert stats['blobs'] == 1
+    assert stats['links'] == 3
+    assert stats['saved_bytes'] == 8
+
+
+def test_unshare_gives_file_its_own_copy(tmp_path):
+    store = DedupStore(str(tmp_path / 'store'))
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+
+    store.store_stream(io.BytesIO(b'same'), str(tree / 'a.txt'))
+    store.copy(str(tree / 'a.txt'), str(tree / 'b.txt'))
+    store.unshare(str(tree / 'b.txt'))
+    (tree / 'b.txt').write_text('changed')
+
+    assert (tree / 'a.txt').read_text() == 'same'
@@ -0,0 +1,105 @@
+"""
+Tests for the archive path and size checks in flaskfilemanager.extract
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from flaskfilemanager.extract import Extractor
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+
+
+def make_tar(path, members):
+    with tarfile.open(path, 'w') as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def extract(tmp_path, archive_name, max_size=1024 * 1024, max_members=100, max_ratio=100):
+    target = tmp_path / 'target'
+    target.mkdir()
+    extractor = Extractor(max_size, max_members, max_ratio, threads=2)
+    job = extractor.start(str(tmp_path / archive_name), str(target))
+    assert job.wait(10)
+    return job, target
+
+
+@pytest.mark.parametrize('make_archive,archive_name', [(make_zip, 'a.zip'), (make_tar, 'a.tar')])
+def test_extracts_safe_archive(tmp_path, make_archive, archive_name):
+    make_archive(str(tmp_path / archive_name), [('dir/a.txt', b'a'), ('b.txt', b'b')])
+
+    job, target = extract(tmp_path, archive_name)
+
+    assert job.status == 'complete'
+    assert (target / 'dir' / 'a.txt').read_bytes() == b'a'
+    assert sorted(job.items) == ['b.txt', 'dir']
+
+
+@pytest.mark.parametrize('make_archive,archive_name', [(make_zip, 'a.zip'), (make_tar, 'a.tar')])
+@pytest.mark.parametrize('member', ['../evil.txt', 'dir/../../evil.txt', '/tmp/evil.txt'])
+def test_rejects_unsafe_paths(tmp_path, make_archive, archive_name, member):
+    make_archive(str(tmp_path / archive_name), [('ok.txt', b'ok'), (member, b'evil')])
+
+    job, target = extract(tmp_path, archive_name)
+
+    assert job.status == 'failed'
+    assert 'unsafe path' in job.error
+    assert not (tmp_path / 'evil.txt').exists()
+    # Anything extracted before the unsafe member is removed again
+    assert os.listdir(str(target)) == []
+
+
+def test_rejects_high_compression_ratio(tmp_path):
+    make_zip(str(tmp_path / 'bomb.zip'), [('zeros', b'\0' * 1024 * 1024)])
+
+    job, target = extract(tmp_path, 'bomb.zip', max_size=10 * 1024 * 1024, max_ratio=10)
+
+    assert job.status == 'failed'
+    assert 'ratio' in job.error
+    assert os.listdir(str(target)) == []
+
+
+@pytest.mark.parametrize('make_archive,archive_name', [(make_zip, 'a.zip'), (make_tar, 'a.tar')])
+def test_rejects_archives_over_max_size(tmp_path, make_archive, archive_name):
+    make_archive(str(tmp_path / archive_name), [('a.bin', os.urandom(4096)), ('b.bin', os.urandom(4096))])
+
+    job, target = extract(tmp_path, archive_name, max_size=6000)
+
+    assert job.status == 'failed'
+    assert 'too large' in job.error
+    assert os.listdir(str(target)) == []
+
+
+def test_rejects_too_many_members(tmp_path):
+    make_zip(str(tmp_path / 'many.zip'), [('f{}.txt'.format(i), b'x') for i in range(11)])
+
+    job, target = extract(tmp_path, 'many.zip', max_members=10)
+
+    assert job.status == 'failed'
+    assert 'more than 10 files' in job.error
+
+
+def test_existing_folders_are_not_new_items(tmp_path):
+    make_zip(str(tmp_path / 'a.zip'), [('docs/new.txt', b'new'), ('fresh/x.txt', b'x')])
+    target = tmp_path / 'target'
+    (target / 'docs').mkdir(parents=True)
+
+    extractor = Extractor(1024 * 1024, 100, 100)
+    job = extractor.start(str(tmp_path / 'a.zip'), str(target))
+    assert job.wait(10)
+
+    assert job.status == 'complete'
+    assert job.items == ['fresh']
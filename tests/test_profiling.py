@@ -0,0 +1,41 @@
+"""
+Tests for profiling connector requests: flaskfilemanager.profiling
+"""
+
+import os
+
+import pytest
+from flask import Flask
+
+from flaskfilemanager.profiling import ConnectorProfiler
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+@pytest.mark.parametrize('mode,expected', [
+    ('getfolder', 'getfolder'),
+    (None, 'none'),
+    ('../../etc/cron.d/x', 'unknown'),
+    ('getfolder/../x', 'unknown'),
+    ('GetFolder', 'unknown'),
+    ('getfolder\n', 'unknown'),
+])
+def test_output_path_mode(tmp_path, mode, expected):
+    profiler = ConnectorProfiler(str(tmp_path))
+
+    with Flask(__name__).test_request_context('/', method='POST'):
+        output_path = profiler.get_output_path(mode)
+
+    assert os.path.dirname(output_path) == str(tmp_path)
+    assert os.path.basename(output_path).split('-')[4] == expected
+
+
+def test_profiled_request_writes_dump(tmp_path):
+    profiler = ConnectorProfiler(str(tmp_path), trigger_key='secret')
+
+    with Flask(__name__).test_request_context('/?profile=secret&mode=../x'):
+        assert profiler.profile('../x', lambda a: a * 2, 21) == 42
+
+    filenames = os.listdir(str(tmp_path))
+    assert len(filenames) == 1
+    assert '-get-unknown-' in filenames[0]
@@ -0,0 +1,169 @@
+"""
+Tests for storage quota accounting: flaskfilemanager.quota and the connector's quota checks
+"""
+
+import io
+
+import pytest
+from flask import Flask
+
+from flaskfilemanager import FileManager
+from flaskfilemanager.quota import QuotaManager
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+CONNECTOR_URL = '/fm/connectors/py/filemanager.py'
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'a.txt').write_bytes(b'a' * 100)
+    (root / 'sub').mkdir()
+    (root / 'sub' / 'b.txt').write_bytes(b'b' * 50)
+    return root
+
+
+def make_quota(tmp_path, limit=1000):
+    return QuotaManager(limit, str(tmp_path / 'state' / 'quota.json'))
+
+
+def test_first_seen_root_is_walked(tmp_path, root):
+    quota = make_quota(tmp_path)
+
+    assert quota.get_usage(str(root)) == 150
+    assert quota.get_remaining(str(root)) == 850
+
+
+def test_add_to_first_seen_root_is_not_counted_twice(tmp_path, root):
+    quota = make_quota(tmp_path)
+
+    # The file has already been written when add() is called, so walking the root counts it
+    (root / 'c.txt').write_bytes(b'c' * 25)
+    quota.add(str(root), 25)
+
+    assert quota.get_usage(str(root)) == 175
+
+
+def test_add_and_has_space(tmp_path, root):
+    quota = make_quota(tmp_path, limit=200)
+    quota.get_usage(str(root))
+
+    quota.add(str(root), 40)
+    assert quota.get_usage(str(root)) == 190
+    assert quota.has_space(str(root), 10)
+    assert not quota.has_space(str(root), 11)
+    # Changes that free space are always allowed
+    assert quota.has_space(str(root), -500)
+
+    quota.add(str(root), -500)
+    assert quota.get_usage(str(root)) == 0
+
+
+def test_usage_survives_restart(tmp_path, root):
+    quota = make_quota(tmp_path)
+    quota.get_usage(str(root))
+    quota.add(str(root), 30)
+    quota.stop()
+
+    # Changes made outside of the filemanager aren't seen until the next reconciliation, which shows that the
+    # usage came from the state file rather than a walk
+    (root / 'a.txt').unlink()
+
+    quota = make_quota(tmp_path)
+    assert quota.get_usage(str(root)) == 180
+
+
+def test_processes_share_state_file(tmp_path, root):
+    quota_1 = make_quota(tmp_path)
+    quota_2 = make_quota(tmp_path)
+    quota_1.get_usage(str(root))
+    quota_1.flush()
+    quota_2.flush()
+
+    quota_1.add(str(root), 10)
+    quota_2.add(str(root), 20)
+    quota_1.flush()
+    quota_2.flush()
+    quota_1.flush()
+
+    assert quota_1.get_usage(str(root)) == 180
+    assert quota_2.get_usage(str(root)) == 180
+
+
+def test_reconcile_corrects_drift(tmp_path, root):
+    quota = make_quota(tmp_path)
+    quota.get_usage(str(root))
+    quota.add(str(root), 1000)
+    (root / 'sub' / 'b.txt').unlink()
+
+    quota.reconcile()
+    assert quota.get_usage(str(root)) == 100
+
+    # The corrected value is what is persisted
+    quota.stop()
+    assert make_quota(tmp_path).get_usage(str(root)) == 100
+
+
+@pytest.fixture
+def app(tmp_path, root):
+    app = Flask(__name__)
+    file_manager = FileManager(app, config={'FILE_PATH': str(root), 'QUOTA_BYTES': 200,
+                                            'QUOTA_STATE_FILE': str(tmp_path / 'state' / 'quota.json')})
+    yield app
+    file_manager.quota.stop()
+
+
+def upload(client, data, query_string=None):
+    return client.post(CONNECTOR_URL, query_string=query_string, data={
+        'mode': 'upload',
+        'path': '/',
+        'files': (io.BytesIO(data), 'c.txt')
+    })
+
+
+def test_upload_rejected_by_content_length(app, root):
+    client = app.test_client()
+
+    # The file would fit in the 50 bytes remaining, but the whole body doesn't, and the body is all we know
+    # about before parsing it
+    response = upload(client, b'c' * 40, query_string={'mode': 'upload'})
+    errors = response.get_json()['errors']
+    assert 'Quota exceeded' in errors[0]['title']
+    assert '40 bytes required' not in errors[0]['title']
+    assert not (root / 'c.txt').exists()
+
+
+def test_upload_checked_on_actual_size_without_mode_in_query(app, root):
+    client = app.test_client()
+
+    response = upload(client, b'c' * 40)
+    assert 'errors' not in response.get_json()
+    assert (root / 'c.txt').read_bytes() == b'c' * 40
+
+    response = client.post(CONNECTOR_URL, data={
+        'mode': 'upload',
+        'path': '/',
+        'files': (io.BytesIO(b'd' * 20), 'd.txt')
+    })
+    assert 'Quota exceeded: 20 bytes required' in response.get_json()['errors'][0]['title']
+    assert not (root / 'd.txt').exists()
+
+
+def test_shrinking_save_near_limit(app, root):
+    client = app.test_client()
+    upload(client, b'c' * 45)
+
+    # 195 of 200 bytes are used.  Saving a smaller version of a file frees space, even though the request is
+    # bigger than the space remaining
+    response = client.post(CONNECTOR_URL, query_string={'mode': 'savefile'},
+                           data={'mode': 'savefile', 'path': '/a.txt', 'content': 'a' * 90})
+    assert response.status_code == 200
+    assert (root / 'a.txt').read_bytes() == b'a' * 90
+
+    # But only the net change is counted when it grows
+    response = client.post(CONNECTOR_URL, data={'mode': 'savefile', 'path': '/a.txt', 'content': 'a' * 120})
+    assert 'Quota exceeded: 30 bytes required' in response.get_json()['errors'][0]['title']
+    assert (root / 'a.txt').read_bytes() == b'a' * 90
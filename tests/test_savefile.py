@@ -0,0 +1,115 @@
+"""
+Tests for the savefile connector mode: atomic replacement and the conflict checks
+"""
+
+import io
+import os
+import stat
+
+import pytest
+from flask import Flask
+
+from flaskfilemanager import FileManager
+from flaskfilemanager.changefeed import TMP_PREFIX
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+CONNECTOR_URL = '/fm/connectors/py/filemanager.py'
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'a.txt').write_text('original')
+    os.chmod(str(root / 'a.txt'), 0o640)
+    return root
+
+
+@pytest.fixture
+def client(root):
+    app = Flask(__name__)
+    FileManager(app, config={'FILE_PATH': str(root)})
+    return app.test_client()
+
+
+def get_etag(client):
+    response = client.get(CONNECTOR_URL + '?mode=getfile&path=/a.txt')
+    return response.get_json()['data']['attributes']['etag']
+
+
+def save(client, content='changed', headers=None, **fields):
+    data = {'mode': 'savefile', 'path': '/a.txt', 'content': content}
+    data.update(fields)
+    return client.post(CONNECTOR_URL, data=data, headers=headers)
+
+
+def test_save_without_precondition(client, root):
+    response = save(client)
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['id'] == '/a.txt'
+    assert (root / 'a.txt').read_text() == 'changed'
+
+
+def test_save_keeps_mode_and_leaves_no_temp_files(client, root):
+    assert save(client).status_code == 200
+
+    assert stat.S_IMODE(os.stat(str(root / 'a.txt')).st_mode) == 0o640
+    assert os.listdir(str(root)) == ['a.txt']
+
+
+def test_matching_etag(client, root):
+    etag = get_etag(client)
+
+    response = save(client, etag=etag)
+    assert response.status_code == 200
+    assert (root / 'a.txt').read_text() == 'changed'
+    # The response has the new version, for the next save
+    assert response.get_json()['data']['attributes']['etag'] != etag
+
+
+def test_matching_if_match(client, root):
+    etag = get_etag(client)
+
+    assert save(client, headers={'If-Match': '"{}"'.format(etag)}).status_code == 200
+    assert (root / 'a.txt').read_text() == 'changed'
+
+
+@pytest.mark.parametrize('precondition', ['etag', 'if_match', 'mtime'])
+def test_stale_version_is_a_conflict(client, root, precondition):
+    etag = get_etag(client)
+    mtime = int(os.stat(str(root / 'a.txt')).st_mtime)
+
+    # Someone else saves in the meantime
+    (root / 'a.txt').write_text('their changes')
+    os.utime(str(root / 'a.txt'), (mtime + 10, mtime + 10))
+
+    if precondition == 'etag':
+        response = save(client, etag=etag)
+    elif precondition == 'if_match':
+        response = save(client, headers={'If-Match': '"{}"'.format(etag)})
+    else:
+        response = save(client, mtime=str(mtime))
+
+    assert response.status_code == 409
+    assert response.get_json()['errors'][0]['code'] == '409'
+    assert (root / 'a.txt').read_text() == 'their changes'
+    assert os.listdir(str(root)) == ['a.txt']
+
+
+def test_streamed_file_part(client, root):
+    content = b'streamed\n' * 100000
+    etag = get_etag(client)
+
+    response = save(client, content=(io.BytesIO(content), 'a.txt'), etag=etag)
+    assert response.status_code == 200
+    assert (root / 'a.txt').read_bytes() == content
+
+
+def test_temp_files_hidden_from_listing(client, root):
+    (root / (TMP_PREFIX + 'abc')).write_text('partial')
+
+    response = client.get(CONNECTOR_URL + '?mode=getfolder&path=/')
+    assert list(response.get_json()['data']) == ['/a.txt']
@@ -0,0 +1,131 @@
+"""
+Tests for signed URLs: flaskfilemanager.signing and the signed routes
+"""
+
+import time
+
+import pytest
+from flask import Flask
+
+from flaskfilemanager import FileManager
+from flaskfilemanager import signing
+from flaskfilemanager.signing import UrlSigner
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+def test_valid_token():
+    signer = UrlSigner('key', expiry=60)
+    token = signer.get_token('userfile', 'a/b.txt', version='1')
+
+    root, expires = signer.verify_token(token, 'userfile', 'a/b.txt')
+    assert root is None
+    assert expires >= time.time() + 60
+
+
+def test_token_includes_root():
+    signer = UrlSigner('key')
+    token = signer.get_token('userfile', 'a.txt', root='/srv/files/user1')
+
+    assert signer.verify_token(token, 'userfile', 'a.txt')[0] == '/srv/files/user1'
+
+
+def test_rejects_other_path_kind_or_key():
+    signer = UrlSigner('key')
+    token = signer.get_token('thumbnail', 'a.txt')
+
+    assert signer.verify_token(token, 'thumbnail', 'b.txt') is None
+    assert signer.verify_token(token, 'userfile', 'a.txt') is None
+    assert UrlSigner('other key').verify_token(token, 'thumbnail', 'a.txt') is None
+
+
+def test_rejects_tampered_tokens():
+    signer = UrlSigner('key')
+    token = signer.get_token('userfile', 'a.txt', root='/srv/files/user1', version='5')
+    expires, version, root, signature = token.split('.')
+    other_root = signing._b64encode(b'/srv/files/user2')
+
+    tampered = [
+        '.'.join([str(int(expires) + 3600), version, root, signature]),
+        '.'.join([expires, '6', root, signature]),
+        '.'.join([expires, version, other_root, signature]),
+        '.'.join([expires, version, root, signature[:-1] + ('A' if signature[-1] != 'A' else 'B')]),
+        '.'.join([expires, version, '', signature]),
+    ]
+    for bad_token in tampered:
+        assert signer.verify_token(bad_token, 'userfile', 'a.txt') is None
+
+
+@pytest.mark.parametrize('token', ['', 'garbage', 'a.b.c.d', '1.2.3', '1.2.!!!.4', '1.2.3.4.5'])
+def test_rejects_malformed_tokens(token):
+    assert UrlSigner('key').verify_token(token, 'userfile', 'a.txt') is None
+
+
+def test_rejects_expired_tokens(monkeypatch):
+    signer = UrlSigner('key', expiry=60)
+    token = signer.get_token('userfile', 'a.txt')
+
+    now = time.time()
+    monkeypatch.setattr(signing.time, 'time', lambda: now + 60 * 1.25 + 1)
+    assert signer.verify_token(token, 'userfile', 'a.txt') is None
+
+
+@pytest.fixture
+def client(tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    (root / 'a.txt').write_text('hello')
+    # Thumbnails are only generated for files with image extensions, but the file is never decoded when the
+    # token is rejected
+    (root / 'b.png').write_bytes(b'not really a png')
+
+    app = Flask(__name__)
+    allowed = {'value': True}
+    FileManager(app, access_control_function=lambda: allowed['value'],
+                config={'FILE_PATH': str(root), 'URL_SIGNING_KEY': 'key'})
+
+    client = app.test_client()
+    client.allowed = allowed
+    return client
+
+
+def get_attributes(client, path):
+    response = client.get('/fm/connectors/py/filemanager.py?mode=getfile&path=' + path)
+    return response.get_json()['data']['attributes']
+
+
+def test_signed_userfile_is_served_without_access(client):
+    url = get_attributes(client, '/a.txt')['path']
+    assert url.startswith('/fm/signed/')
+
+    client.allowed['value'] = False
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == b'hello'
+    assert response.cache_control.public
+    assert response.cache_control.max_age > 0
+    assert not response.cache_control.no_cache
+    assert 'no-cache' not in response.headers['Cache-Control']
+    expires = int(url.split('/signed/')[1].split('.')[0])
+    assert response.expires.timestamp() == expires
+
+
+def test_unsigned_userfile_requires_access(client):
+    assert client.get('/fm/userfiles/a.txt').status_code == 200
+
+    client.allowed['value'] = False
+    assert client.get('/fm/userfiles/a.txt').status_code == 404
+
+
+def test_thumbnail_token_rejected_on_userfile_route(client):
+    thumbnail_url = get_attributes(client, '/b.png')['thumbnail']
+    assert '/thumbnails/' in thumbnail_url
+
+    client.allowed['value'] = False
+    assert client.get(thumbnail_url.replace('/thumbnails/', '/userfiles/')).status_code == 404
+
+
+def test_signed_url_for_one_file_rejected_for_another(client):
+    url = get_attributes(client, '/a.txt')['path']
+
+    assert client.get(url.replace('/a.txt', '/b.png')).status_code == 404
@@ -0,0 +1,61 @@
+"""
+Tests for image variant rendering in flaskfilemanager.variants
+"""
+
+import io
+
+import PIL.Image
+import pytest
+
+from flaskfilemanager.variants import FALLBACK_FORMATS, EXIF_ORIENTATION, negotiate_format, render_variant
+
+__author__ = 'Stephen Brown (Little Fish Solutions LTD)'
+
+
+JPEG = FALLBACK_FORMATS['JPEG']
+
+
+def make_jpeg(path, size, orientation=None):
+    image = PIL.Image.new('RGB', size, (200, 10, 10))
+    if orientation is None:
+        image.save(str(path), quality=90)
+    else:
+        exif = PIL.Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        image.save(str(path), quality=90, exif=exif.tobytes())
+    return str(path)
+
+
+def get_size(data):
+    return PIL.Image.open(io.BytesIO(data)).size
+
+
+@pytest.mark.parametrize('width,height,fit,expected', [
+    (400, None, 'contain', (400, 300)),
+    (None, 150, 'contain', (200, 150)),
+    (400, 400, 'contain', (400, 300)),
+    (400, 400, 'cover', (400, 400)),
+    (400, 400, 'pad', (400, 400)),
+    (8000, None, 'contain', (4000, 3000)),
+])
+def test_variant_sizes(tmp_path, width, height, fit, expected):
+    path = make_jpeg(tmp_path / 'a.jpg', (4000, 3000))
+
+    assert get_size(render_variant(path, width, height, fit, JPEG)) == expected
+
+
+@pytest.mark.parametrize('orientation', [6, 8])
+def test_rotated_jpeg_variant_size(tmp_path, orientation):
+    # Stored as 4000x3000, displayed as 3000x4000
+    path = make_jpeg(tmp_path / 'a.jpg', (4000, 3000), orientation=orientation)
+
+    assert get_size(render_variant(path, 400, None, 'contain', JPEG)) == (400, 533)
+    assert get_size(render_variant(path, None, 400, 'contain', JPEG)) == (300, 400)
+    assert get_size(render_variant(path, 300, 300, 'cover', JPEG)) == (300, 300)
+
+
+def test_negotiate_format():
+    assert negotiate_format('image/webp,*/*', False)[0] in ('WEBP', 'AVIF')
+    assert negotiate_format('image/webp;q=0,*/*', False) == JPEG
+    assert negotiate_format('*/*', True) == FALLBACK_FORMATS['PNG']
+    assert negotiate_format(None, False) == JPEG